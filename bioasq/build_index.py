@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 import chromadb
+import numpy as np
 from datasets import load_dataset
-from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
 
+from .dedup import DedupPlan, plan_dedup
+from .encoders import get_encoder
+from .projection import Projection, fit_projection, projection_path
+
 
 DATASET_NAME = "rag-datasets/rag-mini-bioasq"
 CORPUS_SUBSET = "text-corpus"
@@ -74,6 +78,13 @@ def build_bioasq_chroma_index(
     model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
     batch_size: int = 256,
     limit: Optional[int] = None,
+    encoder_backend: str = "torch",
+    onnx_dir: Optional[str] = None,
+    dedup: bool = False,
+    dedup_threshold: float = 0.85,
+    reduce_dim: Optional[int] = None,
+    reduce_method: str = "pca",
+    pca_sample: int = 10_000,
 ) -> None:
     """
     Build a persistent ChromaDB collection for rag-mini-bioasq's text corpus.
@@ -82,17 +93,30 @@ def build_bioasq_chroma_index(
     - model_name: SentenceTransformers model to embed passages
     - batch_size: how many passages to embed/add per batch
     - limit: optional cap for quick smoke tests (e.g., 2000)
+    - encoder_backend: "torch" (SentenceTransformer) or "onnx" (see bioasq.encoders)
+    - onnx_dir: exported ONNX model directory when encoder_backend="onnx"
+    - dedup: skip exact and near-duplicate passages; each kept passage records
+      the IDs of its dropped duplicates in metadata (see bioasq.dedup)
+    - dedup_threshold: estimated Jaccard similarity for near-duplicates
+    - reduce_dim: store embeddings at this dimension instead of the model's; the
+      projection is saved next to the index and ChromaRM applies it to queries
+    - reduce_method: "pca" or "truncate" (Matryoshka-style prefix; see bioasq.projection)
+    - pca_sample: passages embedded before the PCA projection is fitted
     """
     os.makedirs(persist_dir, exist_ok=True)
 
     # Load dataset (robust split selection)
     ds = _load_corpus_dataset(limit=limit)
 
+    collection_metadata: Dict[str, Any] = {"hnsw:space": "cosine", "embedding_model": model_name}
+    if reduce_dim is not None:
+        collection_metadata.update({"projection": reduce_method, "projection_dim": reduce_dim})
+
     # Create Chroma persistent client + collection
     client = chromadb.PersistentClient(path=persist_dir)
     collection = client.get_or_create_collection(
         name=COLLECTION_NAME,
-        metadata={"hnsw:space": "cosine"},
+        metadata=collection_metadata,
     )
 
     # If the collection already has data, skip rebuild (simple guard).
@@ -101,52 +125,92 @@ def build_bioasq_chroma_index(
         print(f"Chroma collection '{COLLECTION_NAME}' already has {existing} items. Skipping rebuild.")
         return
 
-    print(f"Embedding model: {model_name}")
-    embedder = SentenceTransformer(model_name)
+    plan: Optional[DedupPlan] = None
+    if dedup:
+        # Cheap pre-pass (hashing only) so canonical passages carry their aliases
+        # before anything is embedded or written.
+        print(f"Deduplicating corpus (threshold={dedup_threshold}) ...")
+        plan = plan_dedup(
+            ((i, _get_passage_id(row, fallback_index=i), _get_text_field(row)) for i, row in enumerate(ds)),
+            threshold=dedup_threshold,
+        )
+        print(f"Dropping {len(plan.dropped_rows):,} duplicates ({plan.exact:,} exact, {plan.near:,} near).")
+
+    print(f"Embedding model: {model_name} ({encoder_backend})")
+    embedder = get_encoder(encoder_backend, model_name=model_name, onnx_dir=onnx_dir)
+
+    proj_path = projection_path(persist_dir, COLLECTION_NAME)
+    if os.path.exists(proj_path):
+        # Left over from an earlier build of this (now empty) collection.
+        os.remove(proj_path)
 
     ids: List[str] = []
     docs: List[str] = []
     metas: List[Dict[str, Any]] = []
 
-    def flush() -> None:
-        if not ids:
-            return
-        # Normalize embeddings for cosine similarity
-        embeddings = embedder.encode(
-            docs,
-            show_progress_bar=False,
-            normalize_embeddings=True,
-        ).tolist()
-        collection.add(ids=ids, documents=docs, metadatas=metas, embeddings=embeddings)
-        ids.clear()
-        docs.clear()
-        metas.clear()
+    projection: Optional[Projection] = None
+    # Batches whose raw embeddings wait until there are enough to fit the projection on.
+    held: List[Tuple[List[str], List[str], List[Dict[str, Any]], np.ndarray]] = []
+    fit_after = pca_sample if reduce_method == "pca" else 1
+
+    def add(b_ids: List[str], b_docs: List[str], b_metas: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        if projection is not None:
+            embeddings = projection.apply(embeddings)
+        collection.add(ids=b_ids, documents=b_docs, metadatas=b_metas, embeddings=embeddings.tolist())
+
+    def flush(final: bool = False) -> None:
+        nonlocal projection
+
+        if ids:
+            # Encoders return L2-normalized embeddings for cosine similarity
+            embeddings = embedder.encode(docs)
+            if reduce_dim is None or projection is not None:
+                add(list(ids), list(docs), list(metas), embeddings)
+            else:
+                held.append((list(ids), list(docs), list(metas), embeddings))
+            ids.clear()
+            docs.clear()
+            metas.clear()
+
+        if held and (final or sum(len(h[0]) for h in held) >= fit_after):
+            sample = np.concatenate([h[3] for h in held], axis=0)
+            projection = fit_projection(sample, reduce_dim, method=reduce_method, model_name=model_name)
+            projection.save(proj_path)
+            print(f"Projection: {reduce_method} {projection.input_dim} -> {projection.dim} dims, saved to '{proj_path}'")
+            for h in held:
+                add(*h)
+            held.clear()
 
     total = len(ds)
     print(f"Indexing {total:,} corpus passages into Chroma at '{persist_dir}' ...")
 
     for i, row in enumerate(tqdm(ds, total=total)):
+        if plan is not None and i in plan.dropped_rows:
+            continue
+
         pid = _get_passage_id(row, fallback_index=i)
         text = _get_text_field(row)
 
         if not text.strip():
             continue
 
+        meta: Dict[str, Any] = {
+            "source": "rag-mini-bioasq",
+            "subset": CORPUS_SUBSET,
+            "split_hint": "passages",
+            "row_index": i,
+        }
+        if plan is not None:
+            meta.update(plan.alias_metadata(pid))
+
         ids.append(pid)
         docs.append(text)
-        metas.append(
-            {
-                "source": "rag-mini-bioasq",
-                "subset": CORPUS_SUBSET,
-                "split_hint": "passages",
-                "row_index": i,
-            }
-        )
+        metas.append(meta)
 
         if len(ids) >= batch_size:
             flush()
 
-    flush()
+    flush(final=True)
     print(f"Done. Final collection count: {collection.count():,}")
 
 
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, List, Dict, Any, Optional, Sequence, Tuple, TypeVar
 
 import chromadb
+import numpy as np
+
+from .projection import load_projection, projection_path
+
+if TYPE_CHECKING:
+    from .encoders import Encoder
 
 
 @dataclass
@@ -17,6 +25,155 @@ class _Passage:
     long_text: str
     score: Optional[float] = None
     meta: Optional[Dict[str, Any]] = None
+    embedding: Optional[List[float]] = None
+    id: Optional[str] = None  # Chroma ID; with meta, dedup.passage_ids() recovers any aliases
+
+
+_T = TypeVar("_T")
+
+
+def _is_missing_collection(e: Exception) -> bool:
+    """
+    True if Chroma says the collection behind a Collection object is gone
+    (deleted, or deleted and recreated under a new id).
+    """
+    # Matched by name: the exception class differs across Chroma versions.
+    return type(e).__name__ in ("NotFoundError", "InvalidCollectionException") or "does not exist" in str(e)
+
+
+@dataclass
+class _CollectionHandle:
+    """
+    A shared Chroma collection plus a cached item count.
+
+    The count is only re-read from storage when the collection's version
+    changes: either invalidate() was called in this process, or the on-disk
+    SQLite file changed (another client or process wrote to it). Checking the
+    version is a stat() call, not a storage round trip.
+
+    If the collection is deleted and recreated behind our back, the next call
+    through run() reopens it by name and retries once. If it was only deleted,
+    that call raises.
+    """
+    persist_dir: str
+    collection_name: str
+    client: Any
+    collection: Any
+    _lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+    _generation: int = 0
+    _count: Optional[int] = None
+    _count_version: Optional[Tuple[Any, ...]] = None
+
+    def version(self) -> Tuple[Any, ...]:
+        stamp: List[Any] = [self._generation]
+        for name in ("chroma.sqlite3", "chroma.sqlite3-wal"):
+            try:
+                st = os.stat(os.path.join(self.persist_dir, name))
+            except OSError:
+                stamp.append(None)
+            else:
+                stamp.append((st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+
+    def _reopen(self, stale: Any) -> None:
+        with self._lock:
+            # Another thread may already have replaced it.
+            if self.collection is stale:
+                # get_collection, not get_or_create: a collection that was deleted and
+                # not rebuilt must fail loudly rather than come back empty.
+                self.collection = self.client.get_collection(name=self.collection_name)
+                self._generation += 1
+                self._count = None
+
+    def run(self, fn: Callable[[Any], _T]) -> _T:
+        """
+        Call fn(collection), reopening the collection once if it no longer exists.
+        """
+        collection = self.collection
+        try:
+            return fn(collection)
+        except Exception as e:
+            if not _is_missing_collection(e):
+                raise
+            self._reopen(collection)
+            return fn(self.collection)
+
+    def count(self) -> int:
+        version = self.version()
+        with self._lock:
+            if self._count is None or self._count_version != version:
+                self._count = self.run(lambda c: c.count())
+                # The version read before counting: a write that lands during the
+                # count then leaves the stamp stale, so the next call re-reads.
+                self._count_version = version
+            return self._count
+
+
+# Process-wide registry: one client per persist_dir, one handle per (persist_dir, collection).
+# Chroma clients are thread-safe, so every ChromaRM on the same index shares them and
+# queries run concurrently; the lock only guards creation of new entries.
+_REGISTRY_LOCK = threading.Lock()
+_CLIENTS: Dict[str, Any] = {}
+_HANDLES: Dict[Tuple[str, str], _CollectionHandle] = {}
+
+
+def get_collection_handle(persist_dir: str, collection_name: str) -> _CollectionHandle:
+    """
+    Return the shared handle for (persist_dir, collection_name), creating it on first use.
+    """
+    path = os.path.abspath(persist_dir)
+    key = (path, collection_name)
+
+    handle = _HANDLES.get(key)
+    if handle is not None:
+        return handle
+
+    with _REGISTRY_LOCK:
+        handle = _HANDLES.get(key)
+        if handle is None:
+            client = _CLIENTS.get(path)
+            if client is None:
+                client = chromadb.PersistentClient(path=persist_dir)
+                _CLIENTS[path] = client
+            collection = client.get_or_create_collection(
+                name=collection_name,
+                metadata={"hnsw:space": "cosine"},
+            )
+            handle = _CollectionHandle(
+                persist_dir=path,
+                collection_name=collection_name,
+                client=client,
+                collection=collection,
+            )
+            _HANDLES[key] = handle
+        return handle
+
+
+def evict_collection(persist_dir: str, collection_name: str) -> None:
+    """
+    Drop a collection from the registry; the next ChromaRM on it opens it afresh.
+
+    Instances created earlier keep their handle, which still recovers by itself
+    if the collection was deleted.
+    """
+    with _REGISTRY_LOCK:
+        _HANDLES.pop((os.path.abspath(persist_dir), collection_name), None)
+
+
+def invalidate_collection(persist_dir: str, collection_name: str) -> None:
+    """
+    Force the next count() on a registered collection to go back to storage.
+
+    Writes through Chroma normally change the on-disk version already; call this
+    after writing from this process to refresh without relying on file timestamps.
+    """
+    handle = _HANDLES.get((os.path.abspath(persist_dir), collection_name))
+    if handle is not None:
+        handle.invalidate()
 
 
 @dataclass
@@ -25,36 +182,91 @@ class ChromaRM:
     DSPy Retrieval Model (RM) adapter backed by ChromaDB.
 
     Returns a list of passage objects that have `.long_text` so DSPy Retrieve works.
+
+    If an encoder is given, queries are embedded with it (see bioasq.encoders);
+    otherwise Chroma's default embedding function embeds the query text.
+
+    If the index was built with reduced dimensions (see bioasq.projection), the
+    saved projection is applied to query embeddings automatically; a torch
+    encoder for the index's model is created when none is given.
     """
     persist_dir: str = "data/chroma_bioasq"
     collection_name: str = "bioasq_text_corpus"
+    encoder: Optional["Encoder"] = None
 
     def __post_init__(self) -> None:
-        self._client = chromadb.PersistentClient(path=self.persist_dir)
-        self._collection = self._client.get_or_create_collection(
-            name=self.collection_name,
-            metadata={"hnsw:space": "cosine"},
-        )
+        self._handle = get_collection_handle(self.persist_dir, self.collection_name)
+        self._client = self._handle.client
+
+        self._projection = load_projection(self.persist_dir, self.collection_name)
+        metadata = getattr(self._handle.collection, "metadata", None) or {}
+        if self._projection is None and metadata.get("projection"):
+            # Without it, queries would be embedded at full dimension and Chroma
+            # would only fail later with a dimension mismatch.
+            raise FileNotFoundError(
+                f"Collection '{self.collection_name}' stores {metadata.get('projection_dim')}-dim "
+                f"{metadata['projection']}-projected embeddings, but its projection file is missing: "
+                f"{projection_path(self.persist_dir, self.collection_name)}. "
+                "Copy it along with the Chroma directory (snapshots include it) or rebuild the index."
+            )
+        if self._projection is not None and self.encoder is None:
+            from .encoders import DEFAULT_MODEL_NAME, get_encoder
+
+            self.encoder = get_encoder("torch", model_name=self._projection.model_name or DEFAULT_MODEL_NAME)
 
     def count(self) -> int:
-        return self._collection.count()
+        return self._handle.count()
+
+    def version(self) -> Tuple[Any, ...]:
+        """
+        Opaque stamp that changes whenever the collection may have changed.
+        """
+        return self._handle.version()
 
     def __call__(self, query: str, k: int = 5) -> List[_Passage]:
         if k <= 0:
             return []
 
-        if self._collection.count() == 0:
+        # Cached: only costs a storage call after the collection changed.
+        if self._handle.count() == 0:
             return []
 
-        res = self._collection.query(
-            query_texts=[query],
-            n_results=k,
-            include=["documents", "distances", "metadatas"],
-        )
+        if self.encoder is not None:
+            return self._query(k, query_embeddings=self.project(self.encoder.encode([query])).tolist())
+        return self._query(k, query_texts=[query])
+
+    def project(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Map encoder embeddings into the index's space (identity unless the index is projected).
+        """
+        if self._projection is None:
+            return embeddings
+        return self._projection.apply(embeddings)
+
+    def search(self, embedding: Sequence[float], k: int = 5, with_embeddings: bool = False) -> List[_Passage]:
+        """
+        Retrieve by a precomputed query embedding already in the index's space
+        (i.e. passed through project()).
+
+        With with_embeddings, each passage also carries its stored embedding.
+        """
+        if k <= 0 or self._handle.count() == 0:
+            return []
+        return self._query(k, with_embeddings=with_embeddings, query_embeddings=[[float(x) for x in embedding]])
+
+    def _query(self, k: int, with_embeddings: bool = False, **query: Any) -> List[_Passage]:
+        include = ["documents", "distances", "metadatas"]
+        if with_embeddings:
+            include.append("embeddings")
+
+        res = self._handle.run(lambda c: c.query(n_results=k, include=include, **query))
 
         documents: List[str] = (res.get("documents") or [[]])[0]
         distances: List[float] = (res.get("distances") or [[]])[0]
         metadatas: List[Dict[str, Any]] = (res.get("metadatas") or [[]])[0]
+        ids: List[str] = (res.get("ids") or [[]])[0]
+        # Newer Chroma returns numpy arrays here, so avoid truthiness checks.
+        embeddings = res["embeddings"][0] if with_embeddings and res.get("embeddings") is not None else []
 
         passages: List[_Passage] = []
         for i, doc in enumerate(documents):
@@ -70,6 +282,12 @@ class ChromaRM:
             if i < len(metadatas) and isinstance(metadatas[i], dict):
                 meta = metadatas[i]
 
-            passages.append(_Passage(long_text=str(doc), score=score, meta=meta))
+            embedding: Optional[List[float]] = None
+            if i < len(embeddings) and embeddings[i] is not None:
+                embedding = [float(x) for x in embeddings[i]]
+
+            pid = str(ids[i]) if i < len(ids) else None
+
+            passages.append(_Passage(long_text=str(doc), score=score, meta=meta, embedding=embedding, id=pid))
 
         return passages
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+
+
+# Metadata key on a kept (canonical) passage listing the IDs of passages dropped as its duplicates.
+# Stored as a JSON list string because Chroma metadata values must be scalars.
+ALIASES_KEY = "aliases"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_NON_WORD = re.compile(r"\W+")
+
+
+def _normalize_text(text: str) -> str:
+    """
+    Case-fold and collapse punctuation/whitespace so trivial variants hash equal.
+    """
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def _shingles(normalized: str, size: int = 3) -> Set[str]:
+    words = normalized.split()
+    if len(words) <= size:
+        return {normalized}
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) with bands * rows == num_perm whose LSH S-curve midpoint
+    (1 / bands) ** (1 / rows) is the highest one not above the threshold.
+
+    Erring low favours recall; candidates are verified against the threshold anyway.
+    """
+    best = (num_perm, 1)
+    best_mid = -1.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        mid = (1.0 / bands) ** (1.0 / rows)
+        if best_mid < mid <= threshold:
+            best, best_mid = (bands, rows), mid
+    return best
+
+
+@dataclass
+class NearDuplicateIndex:
+    """
+    Streaming duplicate detector: exact hash of the normalized text, then
+    MinHash/LSH over word shingles for near-duplicates.
+
+    check() is called once per passage in corpus order. The first passage seen
+    becomes canonical; later matches are reported as its duplicates. Memory is
+    bounded by max_entries: once full, the oldest canonical passages are evicted
+    (a duplicate further away than that in the stream is kept, not dropped).
+
+    - threshold: estimated Jaccard similarity over shingles to count as a near-duplicate
+    - num_perm: MinHash signature length
+    """
+    threshold: float = 0.85
+    num_perm: int = 64
+    max_entries: int = 100_000
+    seed: int = 1
+
+    def __post_init__(self) -> None:
+        if not 0.0 < self.threshold <= 1.0:
+            raise ValueError(f"threshold must be in (0, 1], got {self.threshold}")
+
+        rng = np.random.RandomState(self.seed)
+        self._a = rng.randint(1, int(_MERSENNE_PRIME), size=self.num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE_PRIME), size=self.num_perm, dtype=np.uint64)
+        self._bands, self._rows = _choose_bands(self.num_perm, self.threshold)
+
+        self._exact: "OrderedDict[bytes, str]" = OrderedDict()
+        self._signatures: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._buckets: List[Dict[bytes, str]] = [{} for _ in range(self._bands)]
+
+    def _signature(self, normalized: str) -> np.ndarray:
+        hv = np.fromiter((_hash64(s) for s in _shingles(normalized)), dtype=np.uint64)
+        # Universal hashing (a*x + b) mod p; uint64 overflow wraps, as in datasketch.
+        with np.errstate(over="ignore"):
+            phv = ((self._a[:, None] * hv[None, :] + self._b[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+        return phv.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, sig: np.ndarray) -> List[bytes]:
+        r = self._rows
+        return [sig[i * r : (i + 1) * r].tobytes() for i in range(self._bands)]
+
+    def _evict(self) -> None:
+        while len(self._exact) > self.max_entries:
+            self._exact.popitem(last=False)
+        while len(self._signatures) > self.max_entries:
+            pid, sig = self._signatures.popitem(last=False)
+            for bucket, key in zip(self._buckets, self._band_keys(sig)):
+                if bucket.get(key) == pid:
+                    del bucket[key]
+
+    def check(self, pid: str, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Return (canonical_id, kind) if text duplicates an earlier passage,
+        where kind is "exact" or "near"; otherwise register pid and return (None, None).
+        """
+        normalized = _normalize_text(text)
+        digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+
+        canonical = self._exact.get(digest)
+        if canonical is not None:
+            return canonical, "exact"
+
+        sig = self._signature(normalized)
+        keys = self._band_keys(sig)
+
+        candidates: List[str] = []
+        for bucket, key in zip(self._buckets, keys):
+            cand = bucket.get(key)
+            if cand is not None and cand not in candidates:
+                candidates.append(cand)
+        for cand in candidates:
+            cand_sig = self._signatures.get(cand)
+            if cand_sig is not None and float((cand_sig == sig).mean()) >= self.threshold:
+                return cand, "near"
+
+        self._exact[digest] = pid
+        self._signatures[pid] = sig
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, pid)
+        self._evict()
+        return None, None
+
+
+@dataclass
+class DedupPlan:
+    """
+    Result of a dedup pass: which rows to skip and which aliases each kept passage carries.
+    """
+    dropped_rows: Set[int] = field(default_factory=set)
+    aliases: Dict[str, List[str]] = field(default_factory=dict)
+    exact: int = 0
+    near: int = 0
+
+    def alias_metadata(self, pid: str) -> Dict[str, Any]:
+        dropped = self.aliases.get(pid)
+        if not dropped:
+            return {}
+        return {ALIASES_KEY: json.dumps(dropped), "alias_count": len(dropped)}
+
+
+def plan_dedup(
+    rows: Iterable[Tuple[int, str, str]],
+    threshold: float = 0.85,
+    num_perm: int = 64,
+    max_entries: int = 100_000,
+) -> DedupPlan:
+    """
+    Scan (row_index, passage_id, text) tuples once and decide which rows to drop.
+
+    Only hashes and signatures are kept in memory, never the passage texts.
+    """
+    index = NearDuplicateIndex(threshold=threshold, num_perm=num_perm, max_entries=max_entries)
+    plan = DedupPlan()
+
+    for row_index, pid, text in rows:
+        if not text.strip():
+            continue
+        canonical, kind = index.check(pid, text)
+        if canonical is None:
+            continue
+        plan.dropped_rows.add(row_index)
+        plan.aliases.setdefault(canonical, []).append(pid)
+        if kind == "exact":
+            plan.exact += 1
+        else:
+            plan.near += 1
+
+    return plan
+
+
+def passage_ids(pid: str, meta: Optional[Dict[str, Any]]) -> List[str]:
+    """
+    All passage IDs a retrieved passage stands for: its own plus any deduplicated aliases.
+
+    Use this when scoring retrieval against gold passage IDs on a deduplicated index.
+    """
+    ids = [pid]
+    if meta and meta.get(ALIASES_KEY):
+        ids.extend(str(a) for a in json.loads(meta[ALIASES_KEY]))
+    return ids
@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import inspect
+import json
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Protocol
+
+import numpy as np
+
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_ONNX_DIR = "data/onnx/all-MiniLM-L6-v2"
+ENCODER_BACKENDS = ["torch", "onnx"]
+
+ONNX_CONFIG_FILE = "encoder.json"
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class Encoder(Protocol):
+    """
+    Anything that turns texts into embeddings for the Chroma index.
+
+    encode() must return a float32 array of shape (len(texts), dim) whose rows
+    are L2-normalized, so cosine similarity is a plain dot product. Every
+    backend honours the same contract, which is what lets an index built with
+    one backend be queried with another.
+    """
+    model_name: str
+
+    def encode(self, texts: List[str]) -> np.ndarray: ...
+
+
+def _l2_normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return (x / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def _mean_pool(last_hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Average token embeddings, ignoring padding (SentenceTransformers' mean pooling).
+    """
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (last_hidden * mask).sum(axis=1)
+    counts = np.maximum(mask.sum(axis=1), 1e-9)
+    return summed / counts
+
+
+@dataclass
+class SentenceTransformerEncoder:
+    """
+    Reference backend: a full PyTorch SentenceTransformer.
+    """
+    model_name: str = DEFAULT_MODEL_NAME
+    batch_size: int = 32
+    device: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        # Imported lazily: loading torch is most of this backend's startup cost,
+        # and the ONNX backend should not pay it.
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(self.model_name, device=self.device)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = self._model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+@dataclass
+class OnnxEncoder:
+    """
+    CPU backend: an ONNX Runtime session over an exported (optionally int8) model.
+
+    model_dir must contain the files written by export_onnx_encoder. Only
+    onnxruntime and tokenizers are imported; torch is never loaded.
+
+    - quantized: use model.int8.onnx (True) or model.onnx (False); by default,
+      whatever the export produced (int8 if it was quantized)
+    """
+    model_dir: str = DEFAULT_ONNX_DIR
+    quantized: Optional[bool] = None
+    batch_size: int = 32
+    num_threads: Optional[int] = None
+    model_name: str = field(init=False, default="")
+    dim: int = field(init=False, default=0)
+
+    def __post_init__(self) -> None:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        config_path = os.path.join(self.model_dir, ONNX_CONFIG_FILE)
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(
+                f"No {ONNX_CONFIG_FILE} in '{self.model_dir}'. Export one first:\n"
+                f"  python -m bioasq.encoders export --out={self.model_dir}"
+            )
+        with open(config_path, "r", encoding="utf-8") as f:
+            config: Dict[str, Any] = json.load(f)
+
+        self.model_name = config["model_name"]
+        self.dim = int(config["dim"])
+
+        if self.quantized is None:
+            self.quantized = bool(config.get("quantized", True)) and os.path.exists(
+                os.path.join(self.model_dir, ONNX_QUANTIZED_MODEL_FILE)
+            )
+        model_file = ONNX_QUANTIZED_MODEL_FILE if self.quantized else ONNX_MODEL_FILE
+        options = ort.SessionOptions()
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+        self._session = ort.InferenceSession(
+            os.path.join(self.model_dir, model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+        tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, TOKENIZER_FILE))
+        tokenizer.enable_truncation(max_length=int(config["max_length"]))
+        tokenizer.enable_padding(pad_id=int(config["pad_id"]), pad_token=config["pad_token"])
+        self._tokenizer = tokenizer
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        pooled: List[np.ndarray] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = self._tokenizer.encode_batch(texts[start : start + self.batch_size])
+            attention_mask = np.asarray([e.attention_mask for e in batch], dtype=np.int64)
+            feeds = {
+                "input_ids": np.asarray([e.ids for e in batch], dtype=np.int64),
+                "attention_mask": attention_mask,
+            }
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.asarray([e.type_ids for e in batch], dtype=np.int64)
+
+            last_hidden = self._session.run(None, feeds)[0]
+            pooled.append(_mean_pool(last_hidden, attention_mask))
+
+        return _l2_normalize(np.concatenate(pooled, axis=0))
+
+
+def get_encoder(
+    backend: str = "torch",
+    model_name: str = DEFAULT_MODEL_NAME,
+    onnx_dir: Optional[str] = None,
+    onnx_quantized: Optional[bool] = None,
+) -> Encoder:
+    """
+    Create an encoder for the given backend ("torch" or "onnx").
+
+    onnx_quantized picks the int8 or fp32 ONNX model; None follows the export.
+
+    For "onnx", the exported model must have been produced from model_name;
+    mixing models would silently put queries and passages in different spaces.
+    """
+    if backend == "torch":
+        return SentenceTransformerEncoder(model_name=model_name)
+
+    if backend == "onnx":
+        encoder = OnnxEncoder(model_dir=onnx_dir or DEFAULT_ONNX_DIR, quantized=onnx_quantized)
+        if encoder.model_name != model_name:
+            raise ValueError(
+                f'ONNX export in "{encoder.model_dir}" is for "{encoder.model_name}", not "{model_name}".'
+            )
+        return encoder
+
+    raise ValueError(f'Unknown encoder backend "{backend}". Should be one of {ENCODER_BACKENDS}.')
+
+
+def export_onnx_encoder(
+    out_dir: str = DEFAULT_ONNX_DIR,
+    model_name: str = DEFAULT_MODEL_NAME,
+    max_length: int = 256,
+    opset: int = 17,
+    quantize: bool = True,
+) -> str:
+    """
+    Export a SentenceTransformers checkpoint to ONNX for OnnxEncoder.
+
+    Writes model.onnx (fp32), model.int8.onnx (dynamic int8 quantization of the
+    weights, if quantize), tokenizer.json and encoder.json. This is the only
+    step that needs torch, transformers and onnx.
+
+    - max_length: token truncation length (256 matches all-MiniLM-L6-v2's max_seq_length)
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, TOKENIZER_FILE))
+
+    sample = tokenizer(["Which gene is mutated in cystic fibrosis?"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    export_kwargs: Dict[str, Any] = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # Newer torch defaults to the dynamo exporter, which also needs onnxscript;
+        # the TorchScript exporter handles dynamic_axes and needs only onnx.
+        export_kwargs["dynamo"] = False
+
+    fp32_path = os.path.join(out_dir, ONNX_MODEL_FILE)
+    print(f"Exporting {model_name} to {fp32_path} ...")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[n] for n in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+            **export_kwargs,
+        )
+
+    if quantize:
+        int8_path = os.path.join(out_dir, ONNX_QUANTIZED_MODEL_FILE)
+        print(f"Quantizing weights to int8: {int8_path} ...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    config = {
+        "model_name": model_name,
+        "dim": int(model.config.hidden_size),
+        "max_length": max_length,
+        "pad_id": int(tokenizer.pad_token_id),
+        "pad_token": tokenizer.pad_token,
+        "pooling": "mean",
+        "normalize": True,
+        "quantized": quantize,
+    }
+    with open(os.path.join(out_dir, ONNX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2, sort_keys=True)
+
+    print("Done.")
+    return out_dir
+
+
+def cosine_parity(reference: Encoder, candidate: Encoder, texts: List[str]) -> Dict[str, float]:
+    """
+    Per-text cosine similarity between two encoders' embeddings of the same texts.
+    """
+    a = reference.encode(texts)
+    b = candidate.encode(texts)
+    if a.shape != b.shape:
+        raise ValueError(f"Encoders disagree on output shape: {a.shape} vs {b.shape}")
+    cos = (a * b).sum(axis=1)
+    return {"mean": float(cos.mean()), "min": float(cos.min())}
+
+
+# Short biomedical questions/passages used for benchmarks and parity checks.
+SAMPLE_TEXTS: List[str] = [
+    "Which gene is mutated in cystic fibrosis?",
+    "What is the mechanism of action of metformin?",
+    "Is Hirschsprung disease a mendelian or a multifactorial disorder?",
+    "List the signaling molecules that regulate angiogenesis.",
+    "Tooth enamel is highly mineralized; fluoride promotes remineralization under acidic challenge.",
+    "BRCA1 and BRCA2 mutations increase the lifetime risk of breast and ovarian cancer.",
+    "Thyroid hormone receptor beta mediates the effects of T3 in the liver.",
+    "Which drugs are used for the treatment of chronic myeloid leukemia?",
+]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def benchmark_encoder(
+    backend: str,
+    model_name: str = DEFAULT_MODEL_NAME,
+    onnx_dir: Optional[str] = None,
+    repeats: int = 20,
+) -> Dict[str, Any]:
+    """
+    Measure one backend in the current process: load time (imports included),
+    peak RSS after loading, single-query latency and batch throughput.
+
+    Run each backend in its own process (see compare_encoders) so the RSS
+    numbers are not polluted by the other backend.
+    """
+    t0 = time.perf_counter()
+    encoder = get_encoder(backend, model_name=model_name, onnx_dir=onnx_dir)
+    load_s = time.perf_counter() - t0
+    rss_mb = _peak_rss_mb()
+
+    encoder.encode(SAMPLE_TEXTS[:1])  # warm-up
+
+    latencies: List[float] = []
+    for i in range(repeats):
+        q = SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]
+        t0 = time.perf_counter()
+        encoder.encode([q])
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+
+    batch = SAMPLE_TEXTS * 8
+    t0 = time.perf_counter()
+    encoder.encode(batch)
+    batch_s = time.perf_counter() - t0
+
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "peak_rss_mb": rss_mb,
+        "query_p50_ms": 1000 * latencies[len(latencies) // 2],
+        "query_p95_ms": 1000 * latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        "batch_texts_per_s": len(batch) / batch_s if batch_s > 0 else float("inf"),
+    }
+
+
+def compare_encoders(model_name: str = DEFAULT_MODEL_NAME, onnx_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Benchmark every backend, each in a fresh subprocess, and print a table.
+    """
+    results: List[Dict[str, Any]] = []
+    for backend in ENCODER_BACKENDS:
+        cmd = [sys.executable, "-m", "bioasq.encoders", "bench-one", f"--backend={backend}", f"--model={model_name}"]
+        if onnx_dir:
+            cmd.append(f"--onnx-dir={onnx_dir}")
+        proc = subprocess.run(cmd, text=True, capture_output=True)
+        if proc.returncode != 0:
+            print(f"[{backend}] failed:\n{proc.stderr.strip()}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(f"\n{'backend':<8} {'load s':>8} {'RSS MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'batch/s':>9}")
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+        print(
+            f"{r['backend']:<8} {r['load_s']:>8.2f} {rss:>8} {r['query_p50_ms']:>8.2f} "
+            f"{r['query_p95_ms']:>8.2f} {r['batch_texts_per_s']:>9.1f}"
+        )
+    return results
+
+
+def _parse_args(argv: List[str]) -> Dict[str, Any]:
+    """
+    Minimal argument parsing without external deps.
+    Supported:
+      export [--out=DIR] [--model=NAME] [--no-quantize]
+      bench [--onnx-dir=DIR] [--model=NAME]
+      parity [--onnx-dir=DIR] [--model=NAME]
+    """
+    out: Dict[str, Any] = {
+        "command": None,
+        "backend": "torch",
+        "model": DEFAULT_MODEL_NAME,
+        "onnx_dir": None,
+        "out": DEFAULT_ONNX_DIR,
+        "quantize": True,
+    }
+    for a in argv:
+        if a in ("export", "bench", "bench-one", "parity"):
+            out["command"] = a
+        elif a.startswith("--backend="):
+            out["backend"] = a.split("=", 1)[1]
+        elif a.startswith("--model="):
+            out["model"] = a.split("=", 1)[1]
+        elif a.startswith("--onnx-dir="):
+            out["onnx_dir"] = a.split("=", 1)[1]
+        elif a.startswith("--out="):
+            out["out"] = a.split("=", 1)[1]
+        elif a == "--no-quantize":
+            out["quantize"] = False
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args["command"] == "export":
+        export_onnx_encoder(out_dir=args["out"], model_name=args["model"], quantize=args["quantize"])
+        return 0
+
+    if args["command"] == "bench":
+        compare_encoders(model_name=args["model"], onnx_dir=args["onnx_dir"])
+        return 0
+
+    if args["command"] == "bench-one":
+        print(json.dumps(benchmark_encoder(args["backend"], model_name=args["model"], onnx_dir=args["onnx_dir"])))
+        return 0
+
+    if args["command"] == "parity":
+        reference = get_encoder("torch", model_name=args["model"])
+        candidate = get_encoder("onnx", model_name=args["model"], onnx_dir=args["onnx_dir"])
+        stats = cosine_parity(reference, candidate, SAMPLE_TEXTS)
+        print(f"cosine(torch, onnx): mean={stats['mean']:.5f} min={stats['min']:.5f}")
+        return 0
+
+    print("Usage:")
+    print("  python -m bioasq.encoders export [--out=DIR] [--model=NAME] [--no-quantize]")
+    print("  python -m bioasq.encoders bench  [--onnx-dir=DIR] [--model=NAME]")
+    print("  python -m bioasq.encoders parity [--onnx-dir=DIR] [--model=NAME]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import ast
+import json
+import os
+import sys
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import chromadb
+import numpy as np
+
+from .dedup import passage_ids
+from .encoders import DEFAULT_MODEL_NAME, _l2_normalize, get_encoder
+
+
+PROJECTION_METHODS = ["pca", "truncate"]
+
+
+@dataclass
+class Projection:
+    """
+    Linear map from the encoder's embedding space down to the index's stored dimension.
+
+    - "pca": subtract the corpus mean, project onto the top principal components
+    - "truncate": keep the first `dim` coordinates (Matryoshka-style prefix)
+
+    Outputs are re-normalized so cosine distance in the index stays meaningful.
+    """
+    method: str
+    dim: int
+    input_dim: int
+    model_name: Optional[str] = None
+    mean: Optional[np.ndarray] = None
+    components: Optional[np.ndarray] = None  # (dim, input_dim), PCA only
+
+    def apply(self, embeddings: np.ndarray) -> np.ndarray:
+        x = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        if x.shape[1] != self.input_dim:
+            raise ValueError(f"Expected {self.input_dim}-dim embeddings, got {x.shape[1]}")
+        if self.method == "truncate":
+            return _l2_normalize(x[:, : self.dim])
+        return _l2_normalize((x - self.mean) @ self.components.T)
+
+    def save(self, path: str) -> None:
+        arrays: Dict[str, np.ndarray] = {}
+        if self.method == "pca":
+            arrays = {"mean": self.mean, "components": self.components}
+        header = {"method": self.method, "dim": self.dim, "input_dim": self.input_dim, "model_name": self.model_name}
+        # Write through a file object so numpy does not append ".npz" to the name.
+        with open(path, "wb") as f:
+            np.savez(f, header=np.array(json.dumps(header)), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "Projection":
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data["header"]))
+            return cls(
+                method=header["method"],
+                dim=int(header["dim"]),
+                input_dim=int(header["input_dim"]),
+                model_name=header.get("model_name"),
+                mean=data["mean"].astype(np.float32) if "mean" in data else None,
+                components=data["components"].astype(np.float32) if "components" in data else None,
+            )
+
+
+def fit_projection(
+    embeddings: np.ndarray,
+    dim: int,
+    method: str = "pca",
+    model_name: Optional[str] = None,
+) -> Projection:
+    """
+    Fit a projection to `dim` dimensions from a sample of corpus embeddings.
+    """
+    x = np.asarray(embeddings, dtype=np.float32)
+    input_dim = int(x.shape[1])
+    if not 0 < dim <= input_dim:
+        raise ValueError(f"dim must be in [1, {input_dim}], got {dim}")
+
+    if method == "truncate":
+        return Projection(method=method, dim=dim, input_dim=input_dim, model_name=model_name)
+
+    if method == "pca":
+        if x.shape[0] < dim:
+            raise ValueError(f"PCA to {dim} dims needs at least {dim} sample embeddings, got {x.shape[0]}")
+        mean = x.mean(axis=0)
+        # Rows of vt are principal directions, sorted by explained variance.
+        _, _, vt = np.linalg.svd(x - mean, full_matrices=False)
+        return Projection(
+            method=method,
+            dim=dim,
+            input_dim=input_dim,
+            model_name=model_name,
+            mean=mean.astype(np.float32),
+            components=vt[:dim].astype(np.float32),
+        )
+
+    raise ValueError(f'Unknown projection method "{method}". Should be one of {PROJECTION_METHODS}.')
+
+
+def projection_path(persist_dir: str, collection_name: str) -> str:
+    """
+    Where a collection's projection lives: next to the Chroma files in persist_dir.
+    """
+    return os.path.join(persist_dir, f"{collection_name}.projection.npz")
+
+
+def load_projection(persist_dir: str, collection_name: str) -> Optional[Projection]:
+    path = projection_path(persist_dir, collection_name)
+    if not os.path.exists(path):
+        return None
+    return Projection.load(path)
+
+
+def _parse_gold_ids(value: Any) -> Set[str]:
+    """
+    Gold passage IDs come as a list or as its string form (e.g. "[123, 456]").
+    """
+    if value is None:
+        return set()
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return set()
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            value = [v for v in value.replace(",", " ").split() if v]
+    if isinstance(value, (int, str)):
+        value = [value]
+    return {str(v) for v in value}
+
+
+def _recall_at_k(retrieved: List[List[str]], gold: Set[str], k: int) -> float:
+    """
+    Fraction of all gold passages found among the top-k hits (each hit may stand for several IDs).
+    """
+    if not gold:
+        return 0.0
+    found: Set[str] = set()
+    for ids in retrieved[:k]:
+        found.update(ids)
+    return len(found & gold) / len(gold)
+
+
+def _load_corpus(persist_dir: str, collection_name: str, page_size: int = 5000) -> Tuple[List[List[str]], np.ndarray]:
+    collection = chromadb.PersistentClient(path=persist_dir).get_collection(name=collection_name)
+    total = collection.count()
+
+    ids: List[List[str]] = []
+    chunks: List[np.ndarray] = []
+    offset = 0
+    while offset < total:
+        page = collection.get(limit=page_size, offset=offset, include=["embeddings", "metadatas"])
+        page_ids = list(page.get("ids") or [])
+        if not page_ids:
+            break
+        metadatas = page.get("metadatas") or [None] * len(page_ids)
+        ids.extend(passage_ids(pid, meta) for pid, meta in zip(page_ids, metadatas))
+        chunks.append(np.asarray(page.get("embeddings"), dtype=np.float32))
+        offset += len(page_ids)
+
+    return ids, np.concatenate(chunks, axis=0)
+
+
+def recall_curve(
+    persist_dir: str = "data/chroma_bioasq",
+    collection_name: str = "bioasq_text_corpus",
+    dims: Optional[List[int]] = None,
+    methods: Optional[List[str]] = None,
+    k: int = 10,
+    n_questions: Optional[int] = 500,
+    split: Optional[str] = None,
+    model_name: str = DEFAULT_MODEL_NAME,
+    encoder_backend: str = "torch",
+    onnx_dir: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Report recall@k on the BioASQ QA split for each (method, dim).
+
+    Uses the full-dimension index in persist_dir: corpus embeddings are read once,
+    projected in memory per setting and searched exhaustively, so no reduced
+    index has to be built. PCA is fitted on the whole corpus.
+    """
+    # Imported here: rag_bioasq pulls in DSPy, which nothing else in this module needs.
+    from .rag_bioasq import _load_qa_dataset
+
+    if load_projection(persist_dir, collection_name) is not None:
+        raise ValueError("recall_curve needs a full-dimension index; this one is already projected.")
+
+    corpus_ids, corpus = _load_corpus(persist_dir, collection_name)
+    full_dim = int(corpus.shape[1])
+    dims = sorted({d for d in (dims or [full_dim, 256, 128, 64, 32]) if 0 < d <= full_dim}, reverse=True)
+    methods = methods or PROJECTION_METHODS
+
+    ds = _load_qa_dataset(split=split)
+    if n_questions is not None:
+        ds = ds.select(range(min(n_questions, len(ds))))
+    questions: List[str] = []
+    gold: List[Set[str]] = []
+    for r in ds:
+        ids = _parse_gold_ids(r.get("relevant_passage_ids"))
+        if r.get("question") and ids:
+            questions.append(r["question"])
+            gold.append(ids)
+    if not questions:
+        raise RuntimeError("No QA examples with relevant passage IDs found.")
+
+    encoder = get_encoder(encoder_backend, model_name=model_name, onnx_dir=onnx_dir)
+    queries = encoder.encode(questions)
+
+    print(f"recall@{k} over {len(questions)} questions, {len(corpus_ids):,} passages")
+    print(f"{'method':<9} {'dim':>5} {'recall':>8}")
+
+    results: List[Dict[str, Any]] = []
+    for method in methods:
+        for dim in dims:
+            if dim == full_dim:
+                c, q = corpus, queries
+            else:
+                proj = fit_projection(corpus, dim, method=method)
+                c, q = proj.apply(corpus), proj.apply(queries)
+
+            scores = q @ c.T
+            kk = min(k, scores.shape[1])
+            top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+
+            recall = float(
+                np.mean([_recall_at_k([corpus_ids[j] for j in row], g, k) for row, g in zip(top, gold)])
+            )
+            results.append({"method": method, "dim": dim, "k": k, "recall": recall})
+            print(f"{method:<9} {dim:>5} {recall:>8.4f}")
+
+    return results
+
+
+def _parse_args(argv: List[str]) -> Dict[str, Any]:
+    """
+    Minimal argument parsing without external deps.
+    Supported:
+      curve [--persist-dir=DIR] [--dims=384,128,64] [--methods=pca,truncate] [--k=10] [--n=500] [--split=test]
+    """
+    out: Dict[str, Any] = {
+        "command": None,
+        "persist_dir": "data/chroma_bioasq",
+        "dims": None,
+        "methods": None,
+        "k": 10,
+        "n": 500,
+        "split": None,
+    }
+    for a in argv:
+        if a == "curve":
+            out["command"] = a
+        elif a.startswith("--persist-dir="):
+            out["persist_dir"] = a.split("=", 1)[1]
+        elif a.startswith("--dims="):
+            out["dims"] = [int(d) for d in a.split("=", 1)[1].split(",") if d]
+        elif a.startswith("--methods="):
+            out["methods"] = [m for m in a.split("=", 1)[1].split(",") if m]
+        elif a.startswith("--k="):
+            out["k"] = int(a.split("=", 1)[1])
+        elif a.startswith("--n="):
+            out["n"] = int(a.split("=", 1)[1])
+        elif a.startswith("--split="):
+            out["split"] = a.split("=", 1)[1]
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args["command"] == "curve":
+        recall_curve(
+            persist_dir=args["persist_dir"],
+            dims=args["dims"],
+            methods=args["methods"],
+            k=args["k"],
+            n_questions=args["n"],
+            split=args["split"],
+        )
+        return 0
+
+    print("Usage:")
+    print("  python -m bioasq.projection curve [--persist-dir=DIR] [--dims=384,128,64] "
+          "[--methods=pca,truncate] [--k=10] [--n=500] [--split=test]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
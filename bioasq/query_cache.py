@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from .chroma_rm import ChromaRM, _Passage
+
+if TYPE_CHECKING:
+    from .encoders import Encoder
+
+
+@dataclass
+class _CacheEntry:
+    query: str
+    k: int
+    passages: List[_Passage]
+
+
+@dataclass
+class SemanticCacheRM:
+    """
+    DSPy RM wrapper that reuses ChromaRM results for paraphrased questions.
+
+    Recent query embeddings are kept in a fixed-size matrix. A new query whose
+    cosine similarity to a cached one is at least `threshold` gets the cached
+    passages back instead of a Chroma round trip. With `rescore`, those passages
+    are re-scored (and re-ranked) against the new query using their stored
+    embeddings.
+
+    The cache is bounded by max_size with LRU eviction, and is dropped whenever
+    the underlying collection's version changes. A linear scan over at most a
+    few thousand normalized vectors is one small matrix-vector product, which is
+    faster than any ANN structure at this size.
+    """
+    rm: ChromaRM
+    encoder: Optional["Encoder"] = None
+    threshold: float = 0.95
+    max_size: int = 1024
+    rescore: bool = False
+
+    def __post_init__(self) -> None:
+        if self.encoder is None:
+            self.encoder = self.rm.encoder
+        if self.encoder is None:
+            raise ValueError("SemanticCacheRM needs an encoder (pass one, or give the ChromaRM one).")
+        if self.max_size <= 0:
+            raise ValueError(f"max_size must be positive, got {self.max_size}")
+
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None  # (max_size, dim), allocated on first insert
+        self._entries: Dict[int, _CacheEntry] = {}
+        self._lru: "OrderedDict[int, None]" = OrderedDict()  # slot -> None, oldest first
+        self._version: Optional[Tuple[Any, ...]] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_s = 0.0
+        self._miss_latency_s: Optional[float] = None  # running average of Chroma retrieval time, encoding excluded
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_s": self.saved_s,
+        }
+
+    def _nearest(self, q: np.ndarray) -> Optional[int]:
+        """
+        Slot of the most similar cached query, if it is within the threshold.
+        """
+        n = len(self._entries)
+        if n == 0 or self._vectors is None:
+            return None
+        # Slots are filled 0..n-1 and only ever reused, never freed, so they stay contiguous.
+        sims = self._vectors[:n] @ q
+        best = int(np.argmax(sims))
+        return best if sims[best] >= self.threshold else None
+
+    def _insert(self, q: np.ndarray, entry: _CacheEntry, slot: Optional[int] = None) -> None:
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_size, q.shape[0]), dtype=np.float32)
+
+        if slot is None:
+            if len(self._entries) < self.max_size:
+                slot = len(self._entries)
+            else:
+                slot, _ = self._lru.popitem(last=False)
+
+        self._vectors[slot] = q
+        self._entries[slot] = entry
+        self._lru[slot] = None
+        self._lru.move_to_end(slot)
+
+    def _rescored(self, q: np.ndarray, passages: List[_Passage]) -> List[_Passage]:
+        out: List[_Passage] = []
+        for p in passages:
+            if p.embedding is None:
+                out.append(p)
+                continue
+            out.append(replace(p, score=float(np.dot(np.asarray(p.embedding, dtype=np.float32), q))))
+        out.sort(key=lambda p: p.score if p.score is not None else float("-inf"), reverse=True)
+        return out
+
+    def __call__(self, query: str, k: int = 5) -> List[_Passage]:
+        if k <= 0:
+            return []
+
+        # Everything below works in the index's space, so cached vectors and
+        # passage embeddings are directly comparable.
+        q = np.asarray(self.rm.project(self.encoder.encode([query]))[0], dtype=np.float32)
+        # Encoding is paid on hits and misses alike, so neither timer includes it.
+        t0 = time.perf_counter()
+
+        version = self.rm.version()
+        with self._lock:
+            if version != self._version:
+                # The index changed underneath us; cached results may be stale.
+                self._entries.clear()
+                self._lru.clear()
+                self._version = version
+            slot = self._nearest(q)
+            near = self._entries[slot] if slot is not None else None
+            entry = near if near is not None and near.k >= k else None
+            if entry is not None:
+                self._lru.move_to_end(slot)
+
+        if entry is not None:
+            passages = self._rescored(q, entry.passages) if self.rescore else list(entry.passages)
+            lookup_s = time.perf_counter() - t0
+            with self._lock:
+                self.hits += 1
+                if self._miss_latency_s is not None:
+                    self.saved_s += max(0.0, self._miss_latency_s - lookup_s)
+            return passages[:k]
+
+        t1 = time.perf_counter()
+        passages = self.rm.search(q, k=k, with_embeddings=self.rescore)
+        miss_s = time.perf_counter() - t1
+
+        with self._lock:
+            self.misses += 1
+            if self._miss_latency_s is None:
+                self._miss_latency_s = miss_s
+            else:
+                self._miss_latency_s += 0.1 * (miss_s - self._miss_latency_s)
+            if passages:
+                # A near match that only held fewer results is replaced in place
+                # (unless another thread changed that slot in the meantime).
+                if slot is not None and self._entries.get(slot) is not near:
+                    slot = None
+                self._insert(q, _CacheEntry(query=query, k=k, passages=passages), slot=slot)
+
+        return passages
@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import os
 import sys
-from typing import List, Dict, Any, Optional
+import time
+from typing import Iterator, List, Dict, Any, Optional
 
 import dspy
 from datasets import load_dataset
 
 from .chroma_rm import ChromaRM
+from .encoders import DEFAULT_MODEL_NAME, get_encoder
+from .query_cache import SemanticCacheRM
 
 
 DATASET_NAME = "rag-datasets/rag-mini-bioasq"
@@ -83,6 +86,65 @@ def run_demo_question(rag: RAGBioASQ, q: str) -> None:
         print(f"\n[{i}] {p[:350]}{'...' if len(p) > 350 else ''}")
 
 
+def _answer_stream(rag: RAGBioASQ, context: str, question: str) -> Iterator[str]:
+    """
+    Yield answer text chunks as the LM produces them.
+
+    Uses DSPy streaming (dspy.streamify with a listener on the `answer` field).
+    If nothing is streamed (no streaming support, or a cached LM response), the
+    full answer is yielded once generation finishes.
+    """
+    streamify = getattr(dspy, "streamify", None)
+    if streamify is None:
+        yield rag.generate(context=context, question=question).answer
+        return
+
+    program = streamify(
+        rag.generate,
+        stream_listeners=[dspy.streaming.StreamListener(signature_field_name="answer")],
+        async_streaming=False,
+    )
+    streamed = False
+    for item in program(context=context, question=question):
+        if isinstance(item, dspy.streaming.StreamResponse):
+            if item.chunk:
+                streamed = True
+                yield item.chunk
+        elif isinstance(item, dspy.Prediction) and not streamed:
+            yield item.answer
+
+
+def stream_demo_question(rag: RAGBioASQ, q: str) -> None:
+    """
+    Streaming variant of run_demo_question.
+
+    Retrieved passages are printed as soon as retrieval finishes, then the answer
+    is printed chunk by chunk. Time to first passage and time to first answer
+    token are reported. Generation errors propagate after the passages are shown.
+    """
+    t0 = time.perf_counter()
+    ctx = rag.retrieve(q).passages
+    first_passage_s = time.perf_counter() - t0
+
+    print("\nQUESTION:", q)
+    print("\nTOP CONTEXT PASSAGES (truncated):")
+    for i, p in enumerate(ctx[:3], start=1):
+        p = p or ""
+        print(f"\n[{i}] {p[:350]}{'...' if len(p) > 350 else ''}")
+    print(f"\n[timing] first passage: {first_passage_s * 1000:.1f} ms")
+
+    print("\nANSWER: ", end="", flush=True)
+    first_token_s: Optional[float] = None
+    for chunk in _answer_stream(rag, context="\n\n".join(ctx), question=q):
+        if first_token_s is None:
+            first_token_s = time.perf_counter() - t0
+        print(chunk, end="", flush=True)
+    print()
+
+    if first_token_s is not None:
+        print(f"[timing] first token: {first_token_s * 1000:.1f} ms")
+
+
 def _configure_dspy() -> None:
     """
     Configure DSPy RM and (optionally) an LM via environment variables.
@@ -93,12 +155,42 @@ def _configure_dspy() -> None:
       - DSPY_LM: e.g. "openai/gpt-4o-mini" or your preferred model string
       - CHROMA_DIR: default "data/chroma_bioasq"
       - CHROMA_COLLECTION: default "bioasq_text_corpus"
+      - ENCODER_BACKEND: "torch" or "onnx" to embed queries locally
+        (unset: Chroma's default embedding function)
+      - ENCODER_MODEL: default "sentence-transformers/all-MiniLM-L6-v2"
+      - ENCODER_ONNX_DIR: exported ONNX model directory for ENCODER_BACKEND=onnx
+      - SEMANTIC_CACHE_THRESHOLD: e.g. "0.95" to reuse results for paraphrased
+        questions (needs a query encoder: ENCODER_BACKEND, or a reduced-dimension index)
+      - SEMANTIC_CACHE_SIZE: default 1024
     """
     chroma_dir = os.getenv("CHROMA_DIR", "data/chroma_bioasq")
     chroma_collection = os.getenv("CHROMA_COLLECTION", "bioasq_text_corpus")
 
+    encoder = None
+    encoder_backend = os.getenv("ENCODER_BACKEND")
+    if encoder_backend:
+        encoder = get_encoder(
+            encoder_backend,
+            model_name=os.getenv("ENCODER_MODEL", DEFAULT_MODEL_NAME),
+            onnx_dir=os.getenv("ENCODER_ONNX_DIR"),
+        )
+        print(f"Query encoder: {encoder.model_name} ({encoder_backend})")
+
     # Configure retriever (RM)
-    rm = ChromaRM(persist_dir=chroma_dir, collection_name=chroma_collection)
+    rm = ChromaRM(persist_dir=chroma_dir, collection_name=chroma_collection, encoder=encoder)
+
+    cache_threshold = os.getenv("SEMANTIC_CACHE_THRESHOLD")
+    # A reduced-dimension index brings its own encoder, even without ENCODER_BACKEND.
+    if cache_threshold and rm.encoder is not None:
+        rm = SemanticCacheRM(
+            rm=rm,
+            threshold=float(cache_threshold),
+            max_size=int(os.getenv("SEMANTIC_CACHE_SIZE", "1024")),
+        )
+        print(f"Semantic query cache enabled (threshold={cache_threshold})")
+    elif cache_threshold:
+        print("WARNING: SEMANTIC_CACHE_THRESHOLD needs a query encoder (set ENCODER_BACKEND); semantic cache disabled.")
+
     dspy.settings.configure(rm=rm)
 
     # Configure LM if possible (recommended)
@@ -124,13 +216,16 @@ def _parse_args(argv: List[str]) -> Dict[str, Any]:
     Supported:
       --k=5
       --split=test
+      --stream
     """
-    out: Dict[str, Any] = {"k": 5, "split": None}
+    out: Dict[str, Any] = {"k": 5, "split": None, "stream": False}
     for a in argv:
         if a.startswith("--k="):
             out["k"] = int(a.split("=", 1)[1])
         elif a.startswith("--split="):
             out["split"] = a.split("=", 1)[1]
+        elif a == "--stream":
+            out["stream"] = True
     return out
 
 
@@ -157,6 +252,15 @@ def main():
         if q.lower() in ("exit", "quit"):
             break
 
+        if args["stream"]:
+            # Passages are already on screen before generation starts.
+            try:
+                stream_demo_question(rag, q)
+            except Exception as e:
+                print("\nERROR during generation (likely LM not configured).")
+                print(f"\nDetails: {e}\n")
+            continue
+
         # If LM is not configured, calling rag() will raise when ChainOfThought runs.
         # We handle that gracefully: show retrieved passages anyway.
         try:
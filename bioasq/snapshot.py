@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from typing import List, Dict, Any, Optional
+
+import chromadb
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .projection import projection_path
+
+
+SNAPSHOT_FORMAT = "bioasq-chroma-snapshot"
+SNAPSHOT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+PASSAGES_FILE = "passages.parquet"
+EMBEDDINGS_FILE = "embeddings.f32"
+PROJECTION_FILE = "projection.npz"  # only present for dimension-reduced indexes
+
+# Embeddings are stored as a headerless, row-major little-endian float32 array.
+EMBEDDING_DTYPE = "<f4"
+
+_PASSAGES_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("document", pa.string()),
+        ("metadata", pa.string()),  # JSON-encoded; Chroma metadata is a flat dict
+    ]
+)
+
+
+def _sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _file_entry(path: str) -> Dict[str, Any]:
+    return {"sha256": _sha256_file(path), "bytes": os.path.getsize(path)}
+
+
+def read_manifest(snapshot_dir: str) -> Dict[str, Any]:
+    """
+    Load and sanity-check a snapshot manifest.
+
+    The manifest is written last during export, so a missing manifest means
+    the export never finished.
+    """
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {MANIFEST_FILE} in '{snapshot_dir}' (incomplete or not a snapshot).")
+
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Not a {SNAPSHOT_FORMAT} manifest: {path}")
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f'Unsupported snapshot version {manifest.get("version")}. Expected {SNAPSHOT_VERSION}.'
+        )
+    return manifest
+
+
+def verify_snapshot(snapshot_dir: str, manifest: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Check every file listed in the manifest against its recorded size and sha256.
+    """
+    if manifest is None:
+        manifest = read_manifest(snapshot_dir)
+
+    for name, entry in manifest["files"].items():
+        path = os.path.join(snapshot_dir, name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Snapshot file missing: {path}")
+        if os.path.getsize(path) != entry["bytes"]:
+            raise ValueError(f"Snapshot file has wrong size: {path}")
+        if _sha256_file(path) != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch for snapshot file: {path}")
+
+
+def export_chroma_snapshot(
+    out_dir: str,
+    persist_dir: str = "data/chroma_bioasq",
+    collection_name: str = "bioasq_text_corpus",
+    model_name: Optional[str] = None,
+    page_size: int = 5000,
+) -> Dict[str, Any]:
+    """
+    Export a built Chroma collection as a portable, versioned snapshot.
+
+    - out_dir: directory to write the snapshot into (created if needed)
+    - persist_dir / collection_name: the source collection
+    - model_name: embedding model to record; defaults to the one stored on the collection
+    - page_size: rows fetched from Chroma per round trip
+
+    Returns the manifest that was written.
+    """
+    client = chromadb.PersistentClient(path=persist_dir)
+    collection = client.get_collection(name=collection_name)
+    collection_metadata: Dict[str, Any] = dict(collection.metadata or {})
+
+    if model_name is None:
+        model_name = collection_metadata.get("embedding_model")
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        # Drop a stale manifest first so a failed re-export cannot look complete.
+        os.remove(manifest_path)
+
+    passages_path = os.path.join(out_dir, PASSAGES_FILE)
+    embeddings_path = os.path.join(out_dir, EMBEDDINGS_FILE)
+
+    total = collection.count()
+    print(f"Exporting {total:,} items from '{collection_name}' at '{persist_dir}' to '{out_dir}' ...")
+
+    count = 0
+    dim: Optional[int] = None
+    writer = pq.ParquetWriter(passages_path, _PASSAGES_SCHEMA)
+    try:
+        with open(embeddings_path, "wb") as emb_f:
+            offset = 0
+            while offset < total:
+                page = collection.get(
+                    limit=page_size,
+                    offset=offset,
+                    include=["embeddings", "documents", "metadatas"],
+                )
+                ids: List[str] = list(page.get("ids") or [])
+                if not ids:
+                    break
+
+                embeddings = np.asarray(page.get("embeddings"), dtype=EMBEDDING_DTYPE)
+                if embeddings.ndim != 2 or embeddings.shape[0] != len(ids):
+                    raise RuntimeError(f"Collection returned malformed embeddings at offset {offset}.")
+                if dim is None:
+                    dim = int(embeddings.shape[1])
+                elif embeddings.shape[1] != dim:
+                    raise RuntimeError(f"Inconsistent embedding dimension at offset {offset}.")
+
+                documents = page.get("documents") or [None] * len(ids)
+                metadatas = page.get("metadatas") or [None] * len(ids)
+
+                writer.write_table(
+                    pa.table(
+                        {
+                            "id": ids,
+                            "document": list(documents),
+                            "metadata": [json.dumps(m or {}, sort_keys=True) for m in metadatas],
+                        },
+                        schema=_PASSAGES_SCHEMA,
+                    )
+                )
+                embeddings.tofile(emb_f)
+
+                count += len(ids)
+                offset += len(ids)
+    finally:
+        writer.close()
+
+    files = {
+        PASSAGES_FILE: _file_entry(passages_path),
+        EMBEDDINGS_FILE: _file_entry(embeddings_path),
+    }
+    # Without its projection a reduced index cannot embed queries, so it travels along.
+    src_projection = projection_path(persist_dir, collection_name)
+    if os.path.exists(src_projection):
+        dst_projection = os.path.join(out_dir, PROJECTION_FILE)
+        shutil.copyfile(src_projection, dst_projection)
+        files[PROJECTION_FILE] = _file_entry(dst_projection)
+
+    manifest: Dict[str, Any] = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "collection_name": collection_name,
+        "collection_metadata": collection_metadata,
+        "embedding_model": model_name,
+        "count": count,
+        "dim": dim or 0,
+        "dtype": EMBEDDING_DTYPE,
+        "files": files,
+    }
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"Done. Wrote {count:,} items (dim={dim}) to '{out_dir}'.")
+    return manifest
+
+
+def import_chroma_snapshot(
+    snapshot_dir: str,
+    persist_dir: str = "data/chroma_bioasq",
+    collection_name: Optional[str] = None,
+    batch_size: int = 5000,
+    verify: bool = True,
+) -> int:
+    """
+    Bulk-load a snapshot into a Chroma collection without loading any encoder.
+
+    - snapshot_dir: directory produced by export_chroma_snapshot
+    - persist_dir: target PersistentClient path
+    - collection_name: target collection; defaults to the exported name
+    - batch_size: rows per collection.add (capped at the client's max batch size)
+    - verify: check file checksums before loading
+
+    The target collection must be empty. Returns the number of items loaded.
+    """
+    manifest = read_manifest(snapshot_dir)
+    if verify:
+        verify_snapshot(snapshot_dir, manifest)
+
+    if collection_name is None:
+        collection_name = manifest["collection_name"]
+
+    count = int(manifest["count"])
+    dim = int(manifest["dim"])
+
+    os.makedirs(persist_dir, exist_ok=True)
+    client = chromadb.PersistentClient(path=persist_dir)
+    collection = client.get_or_create_collection(
+        name=collection_name,
+        metadata=manifest.get("collection_metadata") or {"hnsw:space": "cosine"},
+    )
+
+    existing = collection.count()
+    if existing > 0:
+        raise RuntimeError(
+            f"Chroma collection '{collection_name}' at '{persist_dir}' already has {existing} items. "
+            "Import into a fresh path or collection."
+        )
+
+    batch_size = max(1, min(batch_size, client.get_max_batch_size()))
+
+    # np.memmap refuses zero-length files, so an empty snapshot gets an empty array.
+    if count:
+        embeddings = np.memmap(
+            os.path.join(snapshot_dir, EMBEDDINGS_FILE),
+            dtype=manifest.get("dtype", EMBEDDING_DTYPE),
+            mode="r",
+            shape=(count, dim),
+        )
+    else:
+        embeddings = np.empty((0, dim), dtype=EMBEDDING_DTYPE)
+
+    print(f"Importing {count:,} items into '{collection_name}' at '{persist_dir}' ...")
+
+    loaded = 0
+    passages = pq.ParquetFile(os.path.join(snapshot_dir, PASSAGES_FILE))
+    for batch in passages.iter_batches(batch_size=batch_size):
+        cols = batch.to_pydict()
+        ids: List[str] = cols["id"]
+        n = len(ids)
+
+        metadatas = [json.loads(m) if m else {} for m in cols["metadata"]]
+        collection.add(
+            ids=ids,
+            documents=cols["document"],
+            # Chroma rejects empty metadata dicts; None means "no metadata".
+            metadatas=[m or None for m in metadatas],
+            embeddings=np.ascontiguousarray(embeddings[loaded : loaded + n], dtype=np.float32),
+        )
+        loaded += n
+
+    if loaded != count:
+        raise RuntimeError(f"Snapshot manifest lists {count} items but {loaded} were loaded.")
+
+    if PROJECTION_FILE in manifest["files"]:
+        shutil.copyfile(
+            os.path.join(snapshot_dir, PROJECTION_FILE),
+            projection_path(persist_dir, collection_name),
+        )
+
+    print(f"Done. Final collection count: {collection.count():,}")
+    return loaded
+
+
+def _parse_args(argv: List[str]) -> Dict[str, Any]:
+    """
+    Minimal argument parsing without external deps.
+    Supported:
+      export --out=DIR [--persist-dir=DIR] [--collection=NAME] [--model=NAME]
+      import --snapshot=DIR [--persist-dir=DIR] [--collection=NAME] [--no-verify]
+    """
+    out: Dict[str, Any] = {
+        "command": None,
+        "out": None,
+        "snapshot": None,
+        "persist_dir": "data/chroma_bioasq",
+        "collection": None,
+        "model": None,
+        "verify": True,
+    }
+    for a in argv:
+        if a in ("export", "import"):
+            out["command"] = a
+        elif a.startswith("--out="):
+            out["out"] = a.split("=", 1)[1]
+        elif a.startswith("--snapshot="):
+            out["snapshot"] = a.split("=", 1)[1]
+        elif a.startswith("--persist-dir="):
+            out["persist_dir"] = a.split("=", 1)[1]
+        elif a.startswith("--collection="):
+            out["collection"] = a.split("=", 1)[1]
+        elif a.startswith("--model="):
+            out["model"] = a.split("=", 1)[1]
+        elif a == "--no-verify":
+            out["verify"] = False
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args["command"] == "export" and args["out"]:
+        export_chroma_snapshot(
+            out_dir=args["out"],
+            persist_dir=args["persist_dir"],
+            collection_name=args["collection"] or "bioasq_text_corpus",
+            model_name=args["model"],
+        )
+        return 0
+
+    if args["command"] == "import" and args["snapshot"]:
+        import_chroma_snapshot(
+            snapshot_dir=args["snapshot"],
+            persist_dir=args["persist_dir"],
+            collection_name=args["collection"],
+            verify=args["verify"],
+        )
+        return 0
+
+    print("Usage:")
+    print("  python -m bioasq.snapshot export --out=DIR [--persist-dir=DIR] [--collection=NAME] [--model=NAME]")
+    print("  python -m bioasq.snapshot import --snapshot=DIR [--persist-dir=DIR] [--collection=NAME] [--no-verify]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
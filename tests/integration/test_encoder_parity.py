@@ -0,0 +1,44 @@
+# tests/integration/test_encoder_parity.py
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+
+pytestmark = pytest.mark.integration
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+pytest.importorskip("tokenizers")
+
+from bioasq import encoders
+
+
+@pytest.fixture(scope="module")
+def onnx_dir(tmp_path_factory) -> Path:
+    """Export all-MiniLM-L6-v2 once; skip if the model cannot be downloaded."""
+    out = tmp_path_factory.mktemp("onnx_encoder")
+    try:
+        encoders.export_onnx_encoder(out_dir=str(out))
+    except OSError as e:
+        pytest.skip(f"model not available offline: {e}")
+    return out
+
+
+@pytest.mark.parametrize("quantized, min_cos", [(False, 0.999), (True, 0.97)])
+def test_onnx_encoder_matches_torch_encoder(onnx_dir: Path, quantized: bool, min_cos: float):
+    """
+    The ONNX backend must stay in the torch encoder's embedding space:
+    the fp32 export is numerically equivalent, int8 stays close.
+    """
+    reference = encoders.get_encoder("torch")
+    candidate = encoders.OnnxEncoder(model_dir=str(onnx_dir), quantized=quantized)
+
+    stats = encoders.cosine_parity(reference, candidate, encoders.SAMPLE_TEXTS)
+
+    assert stats["min"] >= min_cos, stats
+    assert stats["mean"] >= min_cos, stats
@@ -69,3 +69,45 @@ def test_load_corpus_dataset_prefers_passages_split():
     ds = m._load_corpus_dataset(limit=2)
     assert len(ds) == 2
     assert ds[0]["text"] == "t1"
+
+def test_build_index_reduce_dim_fits_pca_and_saves_projection(tmp_path):
+    np = pytest.importorskip("numpy")
+    from bioasq import projection
+
+    class FakeDS(list):
+        def select(self, idxs):
+            return FakeDS([self[i] for i in idxs])
+
+    added = {"embeddings": []}
+    class FakeCollection:
+        def __init__(self, metadata): self.metadata = metadata
+        def count(self): return len(added["embeddings"])
+        def add(self, ids, documents, metadatas, embeddings):
+            added["embeddings"].extend(embeddings)
+    class FakeClient:
+        def __init__(self, path): pass
+        def get_or_create_collection(self, name, metadata=None):
+            added["metadata"] = metadata
+            return FakeCollection(metadata)
+
+    class FakeEncoder:
+        def encode(self, docs):
+            x = np.array([[float(len(d)), 1.0, (len(d) % 3) - 1.0, 0.5] for d in docs], dtype=np.float32)
+            return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+    stubs = {
+        "chromadb": types.SimpleNamespace(PersistentClient=FakeClient),
+        "tqdm": types.SimpleNamespace(tqdm=lambda x, total=None: x),
+        "datasets": _fake_datasets({"passages": FakeDS([{"id": i, "text": "t" * (i + 1)} for i in range(7)])}),
+    }
+    m = import_with_stubs("bioasq.build_index", stubs)
+    m.get_encoder = lambda *args, **kwargs: FakeEncoder()
+
+    m.build_bioasq_chroma_index(persist_dir=str(tmp_path), batch_size=2, reduce_dim=2, pca_sample=4)
+
+    assert len(added["embeddings"]) == 7
+    assert all(len(e) == 2 for e in added["embeddings"])
+    assert added["metadata"]["projection"] == "pca" and added["metadata"]["projection_dim"] == 2
+
+    p = projection.load_projection(str(tmp_path), m.COLLECTION_NAME)
+    assert (p.method, p.input_dim, p.dim) == ("pca", 4, 2)
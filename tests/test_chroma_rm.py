@@ -1,5 +1,7 @@
 import types
 
+import pytest
+
 from tests.test_utils import import_with_stubs
 
 def test_chromarm_empty_k_returns_empty_list():
@@ -36,6 +38,7 @@ def test_chromarm_query_builds_passages_with_score_and_meta():
         def count(self): return 2
         def query(self, **kwargs):
             return {
+                "ids": [["p1", "p2"]],
                 "documents": [["doc1", "doc2"]],
                 "distances": [[0.2, 0.7]],
                 "metadatas": [[{"a":1}, {"b":2}]],
@@ -53,3 +56,194 @@ def test_chromarm_query_builds_passages_with_score_and_meta():
     assert passages[0].long_text == "doc1"
     assert abs(passages[0].score - 0.8) < 1e-9
     assert passages[0].meta == {"a":1}
+    assert [p.id for p in passages] == ["p1", "p2"]
+
+def test_chromarm_passages_resolve_dedup_aliases():
+    class FakeCollection:
+        def count(self): return 1
+        def query(self, **kwargs):
+            return {
+                "ids": [["p1"]],
+                "documents": [["doc1"]],
+                "distances": [[0.1]],
+                "metadatas": [[{"aliases": '["p3", "p7"]', "alias_count": 2}]],
+            }
+    class FakeClient:
+        def __init__(self, path): pass
+        def get_or_create_collection(self, name, metadata=None): return FakeCollection()
+    chromadb = types.SimpleNamespace(PersistentClient=FakeClient)
+
+    m = import_with_stubs("bioasq.chroma_rm", {"chromadb": chromadb})
+    from bioasq import dedup
+
+    [p] = m.ChromaRM(persist_dir="x", collection_name="y")("q", k=1)
+    assert dedup.passage_ids(p.id, p.meta) == ["p1", "p3", "p7"]
+
+def test_chromarm_uses_encoder_for_query_embeddings():
+    seen = {}
+    class FakeCollection:
+        def count(self): return 1
+        def query(self, **kwargs):
+            seen.update(kwargs)
+            return {"documents": [["doc1"]], "distances": [[0.1]], "metadatas": [[{}]]}
+    class FakeClient:
+        def __init__(self, path): pass
+        def get_or_create_collection(self, name, metadata=None): return FakeCollection()
+    chromadb = types.SimpleNamespace(PersistentClient=FakeClient)
+    class FakeEncoder:
+        def encode(self, texts):
+            return types.SimpleNamespace(tolist=lambda: [[0.6, 0.8] for _ in texts])
+
+    m = import_with_stubs("bioasq.chroma_rm", {"chromadb": chromadb})
+    rm = m.ChromaRM(persist_dir="x", collection_name="y", encoder=FakeEncoder())
+    passages = rm("q", k=1)
+
+    assert seen["query_embeddings"] == [[0.6, 0.8]]
+    assert "query_texts" not in seen
+    assert passages[0].long_text == "doc1"
+
+def test_chromarm_instances_share_client_and_cache_count():
+    calls = {"clients": 0, "count": 0, "query": 0}
+    class FakeCollection:
+        def count(self):
+            calls["count"] += 1
+            return 1
+        def query(self, **kwargs):
+            calls["query"] += 1
+            return {"documents": [["doc1"]], "distances": [[0.1]], "metadatas": [[{}]]}
+    class FakeClient:
+        def __init__(self, path): calls["clients"] += 1
+        def get_or_create_collection(self, name, metadata=None): return FakeCollection()
+    chromadb = types.SimpleNamespace(PersistentClient=FakeClient)
+
+    m = import_with_stubs("bioasq.chroma_rm", {"chromadb": chromadb})
+    a = m.ChromaRM(persist_dir="x", collection_name="y")
+    b = m.ChromaRM(persist_dir="x", collection_name="y")
+    for _ in range(3):
+        a("q", k=1)
+        b("q", k=1)
+
+    assert calls == {"clients": 1, "count": 1, "query": 6}
+
+    m.invalidate_collection("x", "y")
+    assert a.count() == 1
+    assert calls["count"] == 2
+
+def test_chromarm_count_rereads_after_write_during_count():
+    store = {"items": 0, "rm": None}
+    class FakeCollection:
+        def count(self):
+            n = store["items"]
+            # A writer adds an item after the storage count but before we return.
+            if n == 0:
+                store["items"] = 1
+                store["rm"]._handle.invalidate()
+            return n
+        def query(self, **kwargs):
+            return {"documents": [["doc1"]], "distances": [[0.1]], "metadatas": [[{}]]}
+    class FakeClient:
+        def __init__(self, path): pass
+        def get_or_create_collection(self, name, metadata=None): return FakeCollection()
+    chromadb = types.SimpleNamespace(PersistentClient=FakeClient)
+
+    m = import_with_stubs("bioasq.chroma_rm", {"chromadb": chromadb})
+    rm = store["rm"] = m.ChromaRM(persist_dir="x", collection_name="y")
+
+    assert rm.count() == 0
+    assert rm.count() == 1
+    assert rm("q", k=1)[0].long_text == "doc1"
+
+def test_chromarm_recovers_after_collection_is_deleted_and_recreated():
+    class NotFoundError(Exception):
+        pass
+    store = {"generation": 0}
+    class FakeCollection:
+        def __init__(self, docs):
+            self.generation, self.docs = store["generation"], docs
+        def _check(self):
+            if self.generation != store["generation"]:
+                raise NotFoundError("Collection [abc] does not exist.")
+        def count(self):
+            self._check()
+            return len(self.docs)
+        def query(self, **kwargs):
+            self._check()
+            return {"documents": [self.docs[:1]], "distances": [[0.1]], "metadatas": [[{}]]}
+    class FakeClient:
+        def __init__(self, path): pass
+        def get_or_create_collection(self, name, metadata=None): return FakeCollection(store["docs"])
+        def get_collection(self, name):
+            if store["docs"] is None:
+                raise NotFoundError(f"Collection {name} does not exist.")
+            return FakeCollection(store["docs"])
+    chromadb = types.SimpleNamespace(PersistentClient=FakeClient)
+
+    store["docs"] = ["old"]
+    m = import_with_stubs("bioasq.chroma_rm", {"chromadb": chromadb})
+    a = m.ChromaRM(persist_dir="x", collection_name="y")
+    assert a("q", k=1)[0].long_text == "old"
+
+    # Delete and recreate under the same name: the registered Collection now points at nothing.
+    store["generation"] += 1
+    store["docs"] = ["new", "newer"]
+
+    b = m.ChromaRM(persist_dir="x", collection_name="y")
+    assert b("q", k=1)[0].long_text == "new"
+    assert a("q", k=1)[0].long_text == "new"
+    assert a.count() == 2
+
+    # Other errors are not swallowed.
+    def boom(**kwargs): raise RuntimeError("disk on fire")
+    b._handle.collection.query = boom
+    with pytest.raises(RuntimeError):
+        b("q", k=1)
+
+    m.evict_collection("x", "y")
+    c = m.ChromaRM(persist_dir="x", collection_name="y")
+    assert c._handle is not a._handle
+
+    # Deleted and not recreated: reads fail instead of recreating an empty collection.
+    store["generation"] += 1
+    store["docs"] = None
+    with pytest.raises(NotFoundError):
+        c("q", k=1)
+
+def test_chromarm_applies_saved_projection_to_query_embeddings(tmp_path):
+    np = pytest.importorskip("numpy")
+    from bioasq import projection
+
+    projection.fit_projection(np.ones((1, 3)), 2, method="truncate", model_name="mini").save(
+        projection.projection_path(str(tmp_path), "y")
+    )
+
+    seen = {}
+    class FakeCollection:
+        def count(self): return 1
+        def query(self, **kwargs):
+            seen.update(kwargs)
+            return {"documents": [["doc1"]], "distances": [[0.1]], "metadatas": [[{}]]}
+    class FakeClient:
+        def __init__(self, path): pass
+        def get_or_create_collection(self, name, metadata=None): return FakeCollection()
+    chromadb = types.SimpleNamespace(PersistentClient=FakeClient)
+    class FakeEncoder:
+        def encode(self, texts): return np.array([[0.6, 0.0, 0.8] for _ in texts], dtype=np.float32)
+
+    m = import_with_stubs("bioasq.chroma_rm", {"chromadb": chromadb})
+    rm = m.ChromaRM(persist_dir=str(tmp_path), collection_name="y", encoder=FakeEncoder())
+    rm("q", k=1)
+
+    assert np.allclose(seen["query_embeddings"], [[1.0, 0.0]])
+
+def test_chromarm_rejects_reduced_index_without_projection_file(tmp_path):
+    class FakeCollection:
+        metadata = {"hnsw:space": "cosine", "projection": "pca", "projection_dim": 128}
+        def count(self): return 1
+    class FakeClient:
+        def __init__(self, path): pass
+        def get_or_create_collection(self, name, metadata=None): return FakeCollection()
+    chromadb = types.SimpleNamespace(PersistentClient=FakeClient)
+
+    m = import_with_stubs("bioasq.chroma_rm", {"chromadb": chromadb})
+    with pytest.raises(FileNotFoundError, match="y.projection.npz"):
+        m.ChromaRM(persist_dir=str(tmp_path), collection_name="y")
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from bioasq import dedup
+
+BASE = (
+    "Cystic fibrosis is caused by mutations in the CFTR gene, which encodes a chloride channel "
+    "expressed in epithelial cells of the lung, pancreas, intestine and sweat glands. The most "
+    "common mutation, F508del, causes misfolding and degradation of the protein."
+)
+
+def test_exact_duplicates_ignore_case_whitespace_and_punctuation():
+    idx = dedup.NearDuplicateIndex()
+    assert idx.check("p1", BASE) == (None, None)
+    assert idx.check("p2", "  " + BASE.upper().replace(",", " ;") + "\n") == ("p1", "exact")
+
+def test_near_duplicate_detected_and_distinct_passage_kept():
+    idx = dedup.NearDuplicateIndex(threshold=0.7)
+    idx.check("p1", BASE)
+
+    near = BASE.replace("the protein.", "the protein in most patients.")
+    assert idx.check("p2", near) == ("p1", "near")
+    assert idx.check("p3", "Metformin lowers hepatic glucose production by activating AMPK.") == (None, None)
+
+def test_plan_dedup_records_aliases_on_canonical_passage():
+    rows = [(0, "p1", BASE), (1, "p2", ""), (2, "p3", BASE.lower()), (3, "p4", "Unrelated text.")]
+    plan = dedup.plan_dedup(rows)
+
+    assert plan.dropped_rows == {2}
+    assert plan.exact == 1 and plan.near == 0
+
+    meta = plan.alias_metadata("p1")
+    assert json.loads(meta[dedup.ALIASES_KEY]) == ["p3"]
+    assert meta["alias_count"] == 1
+    assert plan.alias_metadata("p4") == {}
+    assert dedup.passage_ids("p1", meta) == ["p1", "p3"]
+
+def test_index_memory_is_bounded():
+    idx = dedup.NearDuplicateIndex(max_entries=2)
+    idx.check("p1", "alpha beta gamma delta")
+    idx.check("p2", "epsilon zeta eta theta")
+    idx.check("p3", "iota kappa lambda mu")
+
+    assert len(idx._exact) == 2 and len(idx._signatures) == 2
+    # p1 was evicted, so its duplicate is no longer recognised.
+    assert idx.check("p4", "alpha beta gamma delta") == (None, None)
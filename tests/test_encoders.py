@@ -0,0 +1,94 @@
+import json
+import sys
+import types
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from bioasq import encoders
+
+
+def _fake_onnx_modules(hidden):
+    """Stub onnxruntime + tokenizers; the session returns `hidden` as last_hidden_state."""
+    class FakeSession:
+        def __init__(self, path, sess_options=None, providers=None):
+            self.path = path
+        def get_inputs(self):
+            return [types.SimpleNamespace(name="input_ids"), types.SimpleNamespace(name="attention_mask")]
+        def run(self, outputs, feeds):
+            n, seq = feeds["input_ids"].shape
+            return [hidden[:n, :seq]]
+    ort = types.SimpleNamespace(InferenceSession=FakeSession, SessionOptions=types.SimpleNamespace)
+
+    class FakeTokenizer:
+        @classmethod
+        def from_file(cls, path): return cls()
+        def enable_truncation(self, max_length): pass
+        def enable_padding(self, pad_id, pad_token): pass
+        def encode_batch(self, texts):
+            # "long" texts have two tokens, everything else one (padded to two).
+            return [
+                types.SimpleNamespace(ids=[1, 2], attention_mask=[1, 1 if t == "long" else 0], type_ids=[0, 0])
+                for t in texts
+            ]
+    return ort, types.SimpleNamespace(Tokenizer=FakeTokenizer)
+
+def test_mean_pool_ignores_padding():
+    hidden = np.array([[[1.0, 0.0], [9.0, 9.0]]])
+    mask = np.array([[1, 0]])
+    assert np.allclose(encoders._mean_pool(hidden, mask), [[1.0, 0.0]])
+
+def test_onnx_encoder_pools_and_normalizes(tmp_path, monkeypatch):
+    (tmp_path / encoders.ONNX_CONFIG_FILE).write_text(json.dumps(
+        {"model_name": "mini", "dim": 2, "max_length": 8, "pad_id": 0, "pad_token": "[PAD]"}
+    ))
+    hidden = np.array([
+        [[3.0, 4.0], [100.0, 100.0]],  # second token is padding
+        [[1.0, 0.0], [0.0, 1.0]],
+    ], dtype=np.float32)
+    ort, tokenizers = _fake_onnx_modules(hidden)
+    monkeypatch.setitem(sys.modules, "onnxruntime", ort)
+    monkeypatch.setitem(sys.modules, "tokenizers", tokenizers)
+
+    enc = encoders.OnnxEncoder(model_dir=str(tmp_path), batch_size=2)
+    out = enc.encode(["short", "long"])
+
+    assert enc.model_name == "mini"
+    assert out.dtype == np.float32 and out.shape == (2, 2)
+    assert np.allclose(out[0], [0.6, 0.8])
+    assert np.allclose(out[1], [2 ** -0.5, 2 ** -0.5])
+    assert enc.encode([]).shape == (0, 2)
+
+def test_get_encoder_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        encoders.get_encoder("tensorflow")
+
+def test_cosine_parity_reports_mean_and_min():
+    class Fixed:
+        def __init__(self, rows): self.rows = np.array(rows, dtype=np.float32)
+        def encode(self, texts): return self.rows
+    stats = encoders.cosine_parity(Fixed([[1, 0], [0, 1]]), Fixed([[1, 0], [0.6, 0.8]]), ["a", "b"])
+    assert stats["mean"] == pytest.approx(0.9)
+    assert stats["min"] == pytest.approx(0.8)
+
+@pytest.mark.parametrize("exported_quantized, expected_file", [
+    (False, encoders.ONNX_MODEL_FILE),
+    (True, encoders.ONNX_QUANTIZED_MODEL_FILE),
+])
+def test_onnx_encoder_loads_the_model_file_the_export_produced(tmp_path, monkeypatch, exported_quantized, expected_file):
+    (tmp_path / encoders.ONNX_CONFIG_FILE).write_text(json.dumps(
+        {"model_name": "mini", "dim": 2, "max_length": 8, "pad_id": 0, "pad_token": "[PAD]",
+         "quantized": exported_quantized}
+    ))
+    (tmp_path / encoders.ONNX_MODEL_FILE).write_bytes(b"")
+    if exported_quantized:
+        (tmp_path / encoders.ONNX_QUANTIZED_MODEL_FILE).write_bytes(b"")
+    ort, tokenizers = _fake_onnx_modules(np.zeros((1, 1, 2), dtype=np.float32))
+    monkeypatch.setitem(sys.modules, "onnxruntime", ort)
+    monkeypatch.setitem(sys.modules, "tokenizers", tokenizers)
+
+    enc = encoders.get_encoder("onnx", model_name="mini", onnx_dir=str(tmp_path))
+
+    assert enc.quantized is exported_quantized
+    assert enc._session.path.endswith(expected_file)
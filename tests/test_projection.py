@@ -0,0 +1,56 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from bioasq import projection
+
+
+def test_pca_keeps_dominant_direction_and_normalizes():
+    rng = np.random.RandomState(0)
+    x = np.zeros((50, 3), dtype=np.float32)
+    x[:, 1] = rng.normal(scale=5.0, size=50)
+    x[:, 0] = rng.normal(scale=0.1, size=50)
+    x[:, 2] = rng.normal(scale=0.1, size=50)
+
+    p = projection.fit_projection(x, 2, method="pca", model_name="mini")
+    assert p.components.shape == (2, 3)
+    assert abs(p.components[0, 1]) == pytest.approx(1.0, abs=1e-2)
+
+    y = p.apply(x)
+    assert y.shape == (50, 2)
+    assert np.allclose(np.linalg.norm(y, axis=1), 1.0, atol=1e-5)
+
+def test_truncate_keeps_prefix_and_renormalizes():
+    p = projection.fit_projection(np.ones((1, 3)), 2, method="truncate")
+    assert np.allclose(p.apply(np.array([0.6, 0.0, 0.8])), [[1.0, 0.0]])
+    with pytest.raises(ValueError):
+        p.apply(np.ones((1, 4)))
+
+def test_fit_projection_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        projection.fit_projection(np.ones((4, 3)), 5)
+    with pytest.raises(ValueError):
+        projection.fit_projection(np.ones((4, 3)), 2, method="umap")
+
+@pytest.mark.parametrize("method", ["pca", "truncate"])
+def test_save_load_roundtrip(tmp_path, method):
+    x = np.random.RandomState(1).normal(size=(20, 4)).astype(np.float32)
+    p = projection.fit_projection(x, 2, method=method, model_name="mini")
+    p.save(projection.projection_path(str(tmp_path), "c"))
+
+    q = projection.load_projection(str(tmp_path), "c")
+    assert (q.method, q.dim, q.input_dim, q.model_name) == (method, 2, 4, "mini")
+    assert np.allclose(q.apply(x), p.apply(x))
+    assert projection.load_projection(str(tmp_path), "missing") is None
+
+def test_parse_gold_ids_and_recall_at_k():
+    assert projection._parse_gold_ids("[1, 22]") == {"1", "22"}
+    assert projection._parse_gold_ids([3, "4"]) == {"3", "4"}
+    assert projection._parse_gold_ids("") == set()
+
+    # The second hit stands for a deduplicated alias of a gold passage.
+    hits = [["9"], ["5", "1"], ["22"]]
+    assert projection._recall_at_k(hits, {"1", "22"}, k=2) == pytest.approx(0.5)
+    assert projection._recall_at_k(hits, {"1", "22"}, k=3) == pytest.approx(1.0)
+    # The denominator is all gold passages, even when there are more of them than k.
+    assert projection._recall_at_k(hits, {"1", "22", "30", "31"}, k=2) == pytest.approx(0.25)
@@ -0,0 +1,139 @@
+import types
+
+import pytest
+
+from tests.test_utils import import_with_stubs
+
+np = pytest.importorskip("numpy")
+
+
+class FakeEncoder:
+    def __init__(self, vectors):
+        self.vectors = vectors
+    def encode(self, texts):
+        v = np.array([self.vectors[t] for t in texts], dtype=np.float32)
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+class FakeRM:
+    def __init__(self, encoder):
+        self.encoder = encoder
+        self.searches = 0
+        self.stamp = (0,)
+    def version(self): return self.stamp
+    def project(self, embeddings): return embeddings
+    def search(self, embedding, k=5, with_embeddings=False):
+        self.searches += 1
+        return [
+            types.SimpleNamespace(long_text=f"doc{i}", score=0.5, meta=None, embedding=None)
+            for i in range(k)
+        ]
+
+def _module():
+    return import_with_stubs("bioasq.query_cache", {"chromadb": types.SimpleNamespace()})
+
+def test_paraphrase_within_threshold_hits_cache():
+    m = _module()
+    enc = FakeEncoder({"what causes cf?": [1.0, 0.0], "what is the cause of cf?": [0.99, 0.1], "other": [0.0, 1.0]})
+    rm = FakeRM(enc)
+    cache = m.SemanticCacheRM(rm=rm, threshold=0.95)
+
+    first = cache("what causes cf?", k=3)
+    second = cache("what is the cause of cf?", k=2)
+    cache("other", k=3)
+
+    assert rm.searches == 2
+    assert [p.long_text for p in second] == [p.long_text for p in first[:2]]
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+    assert stats["saved_s"] >= 0.0
+
+def test_larger_k_is_a_miss_and_replaces_entry():
+    m = _module()
+    enc = FakeEncoder({"q": [1.0, 0.0]})
+    rm = FakeRM(enc)
+    cache = m.SemanticCacheRM(rm=rm)
+
+    cache("q", k=2)
+    assert len(cache("q", k=4)) == 4
+    assert rm.searches == 2
+    assert len(cache) == 1
+
+def test_lru_eviction_bounds_size():
+    m = _module()
+    enc = FakeEncoder({"a": [1.0, 0.0, 0.0], "b": [0.0, 1.0, 0.0], "c": [0.0, 0.0, 1.0]})
+    rm = FakeRM(enc)
+    cache = m.SemanticCacheRM(rm=rm, max_size=2)
+
+    cache("a"); cache("b")
+    cache("a")          # hit: "b" is now least recently used
+    cache("c")          # evicts "b"
+    assert len(cache) == 2
+
+    cache("a")
+    assert rm.searches == 3
+    cache("b")
+    assert rm.searches == 4
+
+def test_version_change_drops_cached_results():
+    m = _module()
+    enc = FakeEncoder({"q": [1.0, 0.0]})
+    rm = FakeRM(enc)
+    cache = m.SemanticCacheRM(rm=rm)
+
+    cache("q")
+    rm.stamp = (1,)
+    cache("q")
+    assert rm.searches == 2
+
+def test_rescore_reranks_cached_passages_for_new_query():
+    m = _module()
+    enc = FakeEncoder({"q1": [1.0, 0.0], "q2": [0.96, 0.28]})
+
+    class EmbeddingRM(FakeRM):
+        def search(self, embedding, k=5, with_embeddings=False):
+            self.searches += 1
+            assert with_embeddings
+            return [
+                m._Passage(long_text="y", score=0.8, embedding=[0.0, 1.0]),
+                m._Passage(long_text="x", score=0.9, embedding=[1.0, 0.0]),
+            ]
+    rm = EmbeddingRM(enc)
+    cache = m.SemanticCacheRM(rm=rm, threshold=0.9, rescore=True)
+
+    cache("q1", k=2)
+    out = cache("q2", k=2)
+
+    assert rm.searches == 1
+    assert [p.long_text for p in out] == ["x", "y"]
+    assert out[0].score == pytest.approx(0.96)
+    assert out[1].score == pytest.approx(0.28)
+
+def test_requires_an_encoder():
+    m = _module()
+    with pytest.raises(ValueError):
+        m.SemanticCacheRM(rm=FakeRM(None))
+
+def test_saved_time_excludes_query_encoding():
+    import time
+    m = _module()
+
+    class SlowEncoder(FakeEncoder):
+        def encode(self, texts):
+            time.sleep(0.01)
+            return super().encode(texts)
+
+    class SlowRM(FakeRM):
+        def search(self, embedding, k=5, with_embeddings=False):
+            time.sleep(0.004)
+            return super().search(embedding, k=k, with_embeddings=with_embeddings)
+
+    rm = SlowRM(SlowEncoder({"q": [1.0, 0.0]}))
+    cache = m.SemanticCacheRM(rm=rm)
+    for _ in range(5):
+        cache("q")
+
+    stats = cache.stats()
+    assert stats["hits"] == 4 and rm.searches == 1
+    # Each hit skips a ~4 ms search; the 10 ms encode must not cancel that out.
+    assert stats["saved_s"] >= 4 * 0.002
@@ -15,8 +15,9 @@ def test_parse_args_defaults_and_values():
     datasets = _fake_datasets({"test": []})
     m = import_with_stubs("bioasq.rag_bioasq", {"dspy": dspy, "datasets": datasets})
 
-    assert m._parse_args([]) == {"k": 5, "split": None}
-    assert m._parse_args(["--k=7", "--split=validation"]) == {"k": 7, "split": "validation"}
+    assert m._parse_args([]) == {"k": 5, "split": None, "stream": False}
+    assert m._parse_args(["--k=7", "--split=validation"]) == {"k": 7, "split": "validation", "stream": False}
+    assert m._parse_args(["--stream"])["stream"] is True
 
 def test_load_qa_dataset_prefers_test_then_validation_then_train():
     dspy = DummyDspy()
@@ -63,3 +64,66 @@ def test_load_bioasq_examples_extracts_fields_and_respects_n():
     assert ex[0]["question"] == "q1"
     assert ex[0]["gold_answer"] == "a1"
     assert ex[0]["id"] == "1"
+
+def test_configure_dspy_enables_cache_when_index_brings_its_own_encoder(monkeypatch):
+    dspy = DummyDspy()
+    m = import_with_stubs("bioasq.rag_bioasq", {"dspy": dspy, "datasets": _fake_datasets({"test": []})})
+
+    class FakeRM:
+        # A reduced-dimension index sets up an encoder even without ENCODER_BACKEND.
+        def __init__(self, persist_dir, collection_name, encoder=None):
+            self.encoder = encoder or object()
+    monkeypatch.setattr(m, "ChromaRM", FakeRM)
+    monkeypatch.delenv("ENCODER_BACKEND", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("SEMANTIC_CACHE_THRESHOLD", "0.9")
+
+    m._configure_dspy()
+
+    rm = dspy.settings.configured["rm"]
+    assert isinstance(rm, m.SemanticCacheRM)
+    assert rm.threshold == 0.9
+
+def test_stream_demo_question_shows_passages_then_streams_tokens(capsys, monkeypatch):
+    dspy = pytest.importorskip("dspy")
+    # Keep litellm from fetching its model price list over the network.
+    monkeypatch.setenv("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+    m = import_with_stubs("bioasq.rag_bioasq", {"datasets": _fake_datasets({"test": []})})
+
+    # litellm's mock_response streams the reply back in small chunks, without a network call.
+    lm = dspy.LM(
+        "openai/gpt-4o-mini",
+        api_key="test",
+        cache=False,
+        mock_response=(
+            "[[ ## reasoning ## ]]\nCF is inherited.\n\n"
+            "[[ ## answer ## ]]\nCFTR gene mutations.\n\n"
+            "[[ ## completed ## ]]"
+        ),
+    )
+    def rm(query, k=5):
+        return [types.SimpleNamespace(long_text=f"passage about {query} #{i+1}") for i in range(k)]
+
+    with dspy.context(lm=lm, rm=rm):
+        rag = m.RAGBioASQ(k=2)
+        chunks = list(m._answer_stream(rag, context="ctx", question="what causes cf?"))
+        m.stream_demo_question(rag, "what causes cf?")
+    out = capsys.readouterr().out
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == "CFTR gene mutations."
+    assert len(lm.history) == 2
+    assert "ANSWER: CFTR gene mutations." in out
+    assert out.index("passage about what causes cf? #1") < out.index("ANSWER:")
+    assert out.index("[timing] first passage") < out.index("ANSWER:")
+    assert out.index("ANSWER:") < out.index("[timing] first token")
+
+def test_stream_demo_question_falls_back_to_full_answer_without_streaming(capsys):
+    dspy = DummyDspy()  # no dspy.streamify
+    m = import_with_stubs("bioasq.rag_bioasq", {"dspy": dspy, "datasets": _fake_datasets({"test": []})})
+
+    m.stream_demo_question(m.RAGBioASQ(k=1), "q")
+    out = capsys.readouterr().out
+
+    assert "ANSWER: dummy answer to: q" in out
+    assert "[timing] first token" in out
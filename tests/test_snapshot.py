@@ -0,0 +1,98 @@
+import json
+import types
+
+import pytest
+
+from tests.test_utils import import_with_stubs
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pyarrow")
+
+
+def _fake_chromadb():
+    # One in-memory "disk" shared by every client, keyed by (path, collection).
+    stores = {}
+
+    class FakeCollection:
+        def __init__(self, metadata):
+            self.metadata = metadata
+            self.rows = []
+        def count(self): return len(self.rows)
+        def add(self, ids, documents, metadatas, embeddings):
+            for i, pid in enumerate(ids):
+                self.rows.append((pid, documents[i], metadatas[i], [float(x) for x in embeddings[i]]))
+        def get(self, limit, offset, include):
+            page = self.rows[offset:offset + limit]
+            return {
+                "ids": [r[0] for r in page],
+                "documents": [r[1] for r in page],
+                "metadatas": [r[2] for r in page],
+                "embeddings": [r[3] for r in page],
+            }
+    class FakeClient:
+        def __init__(self, path): self.path = path
+        def get_max_batch_size(self): return 2
+        def get_collection(self, name): return stores[(self.path, name)]
+        def get_or_create_collection(self, name, metadata=None):
+            return stores.setdefault((self.path, name), FakeCollection(metadata))
+    return types.SimpleNamespace(PersistentClient=FakeClient), stores
+
+def test_parse_args_export_and_import():
+    chromadb, _ = _fake_chromadb()
+    m = import_with_stubs("bioasq.snapshot", {"chromadb": chromadb})
+
+    a = m._parse_args(["export", "--out=snap", "--persist-dir=db"])
+    assert a["command"] == "export" and a["out"] == "snap" and a["persist_dir"] == "db"
+
+    b = m._parse_args(["import", "--snapshot=snap", "--collection=c", "--no-verify"])
+    assert b["command"] == "import" and b["snapshot"] == "snap"
+    assert b["collection"] == "c" and b["verify"] is False
+
+def test_export_import_roundtrip_preserves_rows_and_embeddings(tmp_path):
+    chromadb, stores = _fake_chromadb()
+    m = import_with_stubs("bioasq.snapshot", {"chromadb": chromadb})
+
+    src = chromadb.PersistentClient("src").get_or_create_collection(
+        "c", metadata={"hnsw:space": "cosine", "embedding_model": "mini"}
+    )
+    src.add(
+        ids=["p1", "p2", "p3"],
+        documents=["d1", "d2", "d3"],
+        metadatas=[{"row_index": 0}, None, {"row_index": 2}],
+        embeddings=[[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]],
+    )
+
+    manifest = m.export_chroma_snapshot(str(tmp_path), persist_dir="src", collection_name="c", page_size=2)
+    assert manifest["count"] == 3 and manifest["dim"] == 2
+    assert manifest["embedding_model"] == "mini"
+
+    loaded = m.import_chroma_snapshot(str(tmp_path), persist_dir="dst")
+    assert loaded == 3
+
+    dst = stores[("dst", "c")]
+    assert dst.metadata == {"hnsw:space": "cosine", "embedding_model": "mini"}
+    assert [r[0] for r in dst.rows] == ["p1", "p2", "p3"]
+    assert dst.rows[1][2] is None
+    assert dst.rows[2][2] == {"row_index": 2}
+    assert np.allclose(dst.rows[2][3], [0.6, 0.8])
+
+def test_import_rejects_corrupted_snapshot(tmp_path):
+    chromadb, _ = _fake_chromadb()
+    m = import_with_stubs("bioasq.snapshot", {"chromadb": chromadb})
+
+    src = chromadb.PersistentClient("src").get_or_create_collection("c")
+    src.add(ids=["p1"], documents=["d1"], metadatas=[None], embeddings=[[1.0, 0.0]])
+    m.export_chroma_snapshot(str(tmp_path), persist_dir="src", collection_name="c")
+
+    emb = tmp_path / m.EMBEDDINGS_FILE
+    emb.write_bytes(b"\x00" * len(emb.read_bytes()))
+    with pytest.raises(ValueError):
+        m.import_chroma_snapshot(str(tmp_path), persist_dir="dst")
+
+def test_read_manifest_rejects_unknown_version(tmp_path):
+    chromadb, _ = _fake_chromadb()
+    m = import_with_stubs("bioasq.snapshot", {"chromadb": chromadb})
+
+    (tmp_path / m.MANIFEST_FILE).write_text(json.dumps({"format": m.SNAPSHOT_FORMAT, "version": 99}))
+    with pytest.raises(ValueError):
+        m.read_manifest(str(tmp_path))